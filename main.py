@@ -1,7 +1,10 @@
 import argparse
 import json
+import logging
 import os
-import time
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from datetime import datetime
 from pathlib import Path
@@ -13,30 +16,46 @@ from sgfmill import sgf
 
 from src import (
     BACKUP_PATH,
-    CELL_SIZE,
     CORNER_INDEXES,
     GRID_SIZE,
-    HALF_CELL_SIZE,
-    HOSHIS,
     RECORDING_PATH,
-    SCREEN_SIZE,
 )
-from src.stone_classification import load_rf
+from src.utils.board_detection import MIN_GRID_SCORE, detect_corners, grid_score
+from src.utils.board_encoding import pack_board
+from src.utils.cell_extractor import CellExtractor
+from src.utils.classifiers import CLASSIFIERS, ClassifierBackend, load_classifier
 from src.utils.colors import Color
 from src.utils.custom_logger import get_color_logger
 from src.utils.cv2_helper import (
+    TopDownWarp,
     add_grid,
-    blur_and_sharpen,
     convert_to_top_down,
     default_corners,
 )
+from src.utils.dirty_cells import DirtyCellTracker, classify_boards
+from src.utils.drift import DRIFT_INTERVAL, DRIFT_THRESHOLD, DriftTracker
+from src.utils.frame_gate import FrameGate
+from src.utils.frame_grabber import FRAME_BUFFER_SIZE, FileFrameSource, FrameGrabber
 from src.utils.game import Cell, Game
-from src.utils.katago_helper import get_best_variation, start_katago_process
+from src.utils.katago_helper import (
+    get_best_variation,
+    start_katago_process,
+    wait_until_ready,
+)
+from src.utils.renderer import UI_FPS, WINDOW_NAME, BoardRenderer
+from src.utils.smoothing import COMMIT_MARGIN, EMA_ALPHA, CellFilter
+from src.utils.stability import StabilityTracker
+from src.utils.startup import StartupProfile
 
-RF_PATH = "weights/random_forest_model.pkl"
 
 MAX_DEPTH = 9
-AMOUNT_IDENTICAL_IMAGES = 15
+# identical frames in a row before the classified board is evaluated
+AMOUNT_IDENTICAL_IMAGES = 14
+# committed labels of the cell filter rarely flicker, so fewer frames are enough
+SMOOTHED_IDENTICAL_IMAGES = 5
+FRAME_TIMEOUT = 0.1
+# frames are waited for up to this long (seconds) to detect the corners on
+AUTO_CORNERS_TIMEOUT = 10
 
 
 def default_mouse_callback(event, x, y, flags, param):
@@ -45,10 +64,25 @@ def default_mouse_callback(event, x, y, flags, param):
         default_mouse = [x, y]
 
 
-def setup_corners(cap: cv2.VideoCapture) -> list[list[int]]:
+def auto_detect_corners(frame: MatLike) -> list[list[int]] | None:
+    corners = detect_corners(frame)
+    if corners is None:
+        logger.warning("No board found, the corners have to be set up manually")
+        return None
+    corners = [[round(x), round(y)] for x, y in corners]
+    logger.info(f"Detected corners: {corners}")
+    return corners
+
+
+def setup_corners(
+    grabber: FrameGrabber | FileFrameSource,
+    corners_path: Path,
+    corners: list[list[int]] | None = None,
+) -> list[list[int]]:
     shape = (1080, 1920, 0)
     y, x, _ = shape
-    corners = default_corners(shape)
+    corners = corners or default_corners(shape)
+    detect = False
 
     selected_corner = None
 
@@ -62,16 +96,21 @@ def setup_corners(cap: cv2.VideoCapture) -> list[list[int]]:
             continue
         # TODO(2025-09-12 15:09:30): Maybe add "l" to load corners instead of passing a cli flag?
         if key == ord("s"):
-            save_corners_to_file(corners)
+            save_corners_to_file(corners, corners_path)
             continue
+        if key == ord("a"):
+            detect = True
 
-        ret, frame = cap.read()
-        display_img = deepcopy(frame)
-
-        # Handling connecting issues with Iphone
-        if not ret:
-            time.sleep(2)
+        # reconnecting (e.g. Iphone) is handled by the grabber. Keep polling keys meanwhile
+        # peek => a video file does not advance during the setup
+        captured = grabber.peek(timeout=FRAME_TIMEOUT)
+        if captured is None:
             continue
+        frame = captured.image
+        if detect:
+            detect = False
+            corners = auto_detect_corners(frame) or corners
+        display_img = deepcopy(frame)
 
         display_img = cv2.resize(display_img, (x, y))
 
@@ -94,13 +133,13 @@ def setup_corners(cap: cv2.VideoCapture) -> list[list[int]]:
     return corners
 
 
-def save_corners_to_file(corners: list[list[int]]) -> None:
-    with open(Path.joinpath(BACKUP_PATH, "corners.json"), "w") as f:
+def save_corners_to_file(corners: list[list[int]], corners_path: Path) -> None:
+    with open(corners_path, "w") as f:
         json.dump(corners, f, indent=4)
-    logger.info(f"Saved corners to: {BACKUP_PATH}")
+    logger.info(f"Saved corners to: {corners_path}")
 
 
-def try_to_load_corners_from_file() -> list[list[int]] | None:
+def try_to_load_corners_from_file(corners_path: Path) -> list[list[int]] | None:
     if not Path.exists(corners_path):
         logger.warning(
             f"No corner backup found in: {corners_path}. Manual setup required"
@@ -110,81 +149,6 @@ def try_to_load_corners_from_file() -> list[list[int]] | None:
         return json.load(f)
 
 
-def classify_all_cells(model, frame: MatLike) -> list[Cell]:
-    low_offsets = np.arange(0, GRID_SIZE) * CELL_SIZE - HALF_CELL_SIZE
-    high_offsets = np.arange(1, GRID_SIZE + 1) * CELL_SIZE + HALF_CELL_SIZE
-
-    low_offsets = np.clip(low_offsets, 0, frame.shape[0])
-    high_offsets = np.clip(high_offsets, 0, frame.shape[1])
-
-    cells = np.array(
-        [
-            cv2.resize(
-                frame[
-                    low_offsets[y] : high_offsets[y], low_offsets[x] : high_offsets[x]
-                ],
-                (CELL_SIZE, CELL_SIZE),
-            ).flatten()
-            for y in range(GRID_SIZE)
-            for x in range(GRID_SIZE)
-        ]
-    )
-
-    results = model.predict(cells)
-    results = [Cell(r) for r in results]
-
-    return results
-
-
-def base_visual_board() -> MatLike:
-    frame = np.full((SCREEN_SIZE, SCREEN_SIZE, 3), Color.BROWN.value, dtype=np.uint8)
-
-    # draw lines
-    for i in range(GRID_SIZE):
-        start = HALF_CELL_SIZE
-        end = SCREEN_SIZE - HALF_CELL_SIZE
-        height = i * CELL_SIZE + HALF_CELL_SIZE
-        frame = cv2.line(frame, (start, height), (end, height), Color.BLACK.value, 1)
-        frame = cv2.line(frame, (height, start), (height, end), Color.BLACK.value, 1)
-
-    # draw hoshis
-    for x in HOSHIS:
-        for y in HOSHIS:
-            frame = cv2.circle(
-                frame,
-                (HALF_CELL_SIZE + x * CELL_SIZE, HALF_CELL_SIZE + y * CELL_SIZE),
-                int(CELL_SIZE * 0.1),
-                Color.BLACK.value,
-                -1,
-            )
-    return frame
-
-
-def add_stones_to_visual(frame, board: list[list[Cell]]) -> None:
-    for col in range(GRID_SIZE):
-        for row in range(GRID_SIZE):
-            cell = board[col][row].value
-            if cell == 1:
-                color = Color.BLACK.value
-            elif cell == 2:
-                color = Color.WHITE.value
-            else:
-                color = None
-
-            if color:
-                frame = cv2.circle(
-                    frame,
-                    (
-                        HALF_CELL_SIZE + CELL_SIZE * row,
-                        HALF_CELL_SIZE + CELL_SIZE * col,
-                    ),
-                    HALF_CELL_SIZE,
-                    color,
-                    -1,
-                )
-    return frame
-
-
 def diff_between_boards(current_board: list[list[Cell]], new_board: list[Cell]) -> list:
     diff = []
     for i in range(len(new_board)):
@@ -203,7 +167,33 @@ def diff_between_boards(current_board: list[list[Cell]], new_board: list[Cell])
 def get_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Example CLI with argparse")
     parser.add_argument(
-        "-c", "--camera", type=int, default=0, help="Camera index. Starts at 0"
+        "-c",
+        "--camera",
+        type=int,
+        nargs="+",
+        default=[0],
+        help="Camera index. Starts at 0. Multiple cameras record one board each",
+    )
+    parser.add_argument(
+        "-s",
+        "--source",
+        type=Path,
+        nargs="+",
+        default=None,
+        help="Video files or directories of images to process instead of cameras",
+    )
+    parser.add_argument(
+        "--corners",
+        type=Path,
+        nargs="+",
+        default=None,
+        help="Corner files, one per camera/source. Default is backup/corners.json for a single board and backup/corners_<camera>.json for multiple boards",
+    )
+    parser.add_argument(
+        "--frame-step",
+        type=float,
+        default=0.0,
+        help="Only used with --source. Min. seconds between processed frames, based on the timestamps of the source. --identical-frames counts the processed frames",
     )
     parser.add_argument(
         "--enable-katago",
@@ -215,8 +205,26 @@ def get_args() -> argparse.Namespace:
     parser.add_argument(
         "--identical-frames",
         type=int,
-        default=AMOUNT_IDENTICAL_IMAGES,
-        help="Amount of identical frames required to trigger stone evaluation. Default is 15 for 30fps -> 0.5s",
+        default=None,
+        help=f"Amount of identical frames in a row required to trigger stone evaluation. Default is {AMOUNT_IDENTICAL_IMAGES} for 30fps -> ~0.5s, {SMOOTHED_IDENTICAL_IMAGES} with --smoothing",
+    )
+    parser.add_argument(
+        "--smoothing",
+        action="store_true",
+        default=False,
+        help="Smooths the class probabilities of each cell over time and only changes a cell once it is confident",
+    )
+    parser.add_argument(
+        "--smoothing-alpha",
+        type=float,
+        default=EMA_ALPHA,
+        help="Only used with --smoothing. Weight of the newest frame in the moving average",
+    )
+    parser.add_argument(
+        "--commit-margin",
+        type=float,
+        default=COMMIT_MARGIN,
+        help="Only used with --smoothing. Lead in smoothed probability a class needs over the current label to change a cell",
     )
     parser.add_argument(
         "--use-saved-corners",
@@ -225,6 +233,85 @@ def get_args() -> argparse.Namespace:
         dest="use_saved_corners",  # optional: name the positive concept
         help='Uses saved corners instead of manual setup. Press "s" after manual setup is done to save corners',
     )
+    parser.add_argument(
+        "--auto-corners",
+        action="store_true",
+        default=False,
+        help='Detects the corners on the first frame if no saved corners are used. They can still be adjusted during the setup, "a" detects them again',
+    )
+    parser.add_argument(
+        "--track-drift",
+        action="store_true",
+        default=False,
+        help="Follows the board with optical flow near the corners if it is moved during the recording",
+    )
+    parser.add_argument(
+        "--drift-interval",
+        type=int,
+        default=DRIFT_INTERVAL,
+        help="Only used with --track-drift. Frames between two checks of the board position",
+    )
+    parser.add_argument(
+        "--drift-threshold",
+        type=float,
+        default=DRIFT_THRESHOLD,
+        help="Only used with --track-drift. Movement of a corner in cells until the corners are corrected",
+    )
+    parser.add_argument(
+        "--frame-gate",
+        action="store_true",
+        default=False,
+        help="Skips frames with hands over the board, motion blur or bad exposure before the cells are classified",
+    )
+    parser.add_argument(
+        "--frame-buffer",
+        type=int,
+        default=FRAME_BUFFER_SIZE,
+        help="Amount of newest camera frames kept by the capture thread. Older frames are dropped",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        default=False,
+        help="Runs without any window. Requires --use-saved-corners or --auto-corners, stop with Ctrl+C",
+    )
+    parser.add_argument(
+        "--classifier",
+        choices=list(CLASSIFIERS),
+        default="rf",
+        help="Backend which classifies the cells",
+    )
+    parser.add_argument(
+        "--model",
+        type=Path,
+        default=None,
+        help="Weights of the classifier. Default is the backend's file in weights/, e.g. a feature model from src/scripts/train_classifier.py for rf",
+    )
+    parser.add_argument(
+        "--classifier-threads",
+        type=int,
+        default=None,
+        help="Threads used by the classifier. Default is the backend's default",
+    )
+    parser.add_argument(
+        "--no-channels-last",
+        action="store_false",
+        default=True,
+        dest="channels_last",
+        help="Only used with --classifier cnn. Uses the contiguous (N, C, H, W) layout",
+    )
+    parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        default=False,
+        help="Logs when imports, model loading and KataGo finished during startup",
+    )
+    parser.add_argument(
+        "--ui-fps",
+        type=int,
+        default=UI_FPS,
+        help="Max. frame rate of the recording window",
+    )
     return parser.parse_args()
 
 
@@ -241,9 +328,9 @@ def add_move_to_sgf(
     return new_child
 
 
-def save_sgf_to_file(sgf_game) -> None:
+def save_sgf_to_file(sgf_game, sgf_path: Path) -> None:
     logger.debug("Saving SGF")
-    with open((f"{RECORDING_PATH}/{timestamp}.sgf"), "wb") as f:
+    with open(sgf_path, "wb") as f:
         f.write(sgf_game.serialise())
 
 
@@ -266,106 +353,133 @@ def add_chaos_to_sgf(child: sgf.Tree_node, moves: list[dict]) -> sgf.Tree_node:
     return new_child
 
 
-def main() -> None:
-    args = get_args()
-
-    os.makedirs(BACKUP_PATH, exist_ok=True)
-    os.makedirs(RECORDING_PATH, exist_ok=True)
-
-    cap = cv2.VideoCapture(args.camera)
-    logger.info(f"Using Camera {args.camera}")
-
-    if not cap.isOpened():
-        logger.error("Camera could not be openend")
-        exit(1)
-
-    # TODO(2025-09-12 23:09:85): merge default and transformed into a single one
-    # Mouse movement will only be allowed up to border of default one
-    cv2.namedWindow("Default")
-    cv2.setMouseCallback("Default", default_mouse_callback)
-    cv2.namedWindow("Transformed")
-
-    corners = None
-    if args.use_saved_corners:
-        corners = try_to_load_corners_from_file()
-
-    if corners:
-        logger.debug("Corner backup found and loaded")
-    else:
-        corners = setup_corners(cap)
-
-    logger.debug("Katago enabled. Trying to start it ...")
-    model = load_rf(RF_PATH)
-
-    katago_process = None
-    if args.use_katago:
-        katago_process = start_katago_process()
-
-    logger.debug("Katago started successfully")
-
-    visual_board = base_visual_board()
-
-    last_results = []
-
-    # handles game logic
-    game = Game()
-
-    # handles game recording
-    sgf_game = sgf.Sgf_game(size=19)
-    sgf_root = sgf_game.get_root()
-    sgf_child = sgf_root.new_child()
-
-    while True:
-        key = cv2.waitKey(1) & 0xFF
-        if key in [ord("q"), 27]:  # 27 = ESC
-            break
-
-        _, frame = cap.read()
-        image = convert_to_top_down(frame, corners)
-        image = blur_and_sharpen(image)
-        classified_cells = classify_all_cells(model, image)
+class BoardLogger(logging.LoggerAdapter):
+    """Prefixes messages with the board name if multiple boards are recorded."""
+
+    def process(self, msg, kwargs):
+        return f"{self.extra['prefix']}{msg}", kwargs
+
+
+class BoardRecorder:
+    """Camera, corners, game state and sgf recording of a single board."""
+
+    def __init__(
+        self,
+        name: str,
+        grabber: FrameGrabber | FileFrameSource,
+        corners: list[list[int]],
+        sgf_path: Path,
+        identical_frames: int,
+        katago_process=None,
+        renderer: BoardRenderer | None = None,
+        prefix: str = "",
+        cell_filter: CellFilter | None = None,
+        drift_interval: int | None = None,
+        drift_threshold: float = DRIFT_THRESHOLD,
+        frame_gate: FrameGate | None = None,
+    ):
+        self.name = name
+        self.grabber = grabber
+        self.sgf_path = sgf_path
+        self.identical_frames = identical_frames
+        self.katago_process = katago_process
+        self.renderer = renderer
+        self.logger = BoardLogger(logger, {"prefix": prefix})
+
+        self.warp = TopDownWarp(corners)
+        # created with the first frame, None disables the drift tracking
+        self.drift_interval = drift_interval
+        self.drift_threshold = drift_threshold
+        self.drift: DriftTracker | None = None
+        self.frame_gate = frame_gate
+        self.tracker = DirtyCellTracker(CellExtractor(preprocess=True))
+        self.cell_filter = cell_filter
+        self.stability = StabilityTracker()
+
+        # handles game logic
+        self.game = Game()
+
+        # handles game recording
+        self.sgf_game = sgf.Sgf_game(size=19)
+        sgf_root = self.sgf_game.get_root()
+        self.sgf_child = sgf_root.new_child()
+
+    def save(self) -> None:
+        save_sgf_to_file(self.sgf_game, self.sgf_path)
+
+    def track(self, frame: MatLike) -> None:
+        """Moves the corners along with the board before the frame is warped."""
+        if self.drift_interval is None:
+            return
+        if self.drift is None:
+            self.drift = DriftTracker(
+                frame, self.warp.corners, self.drift_interval, self.drift_threshold
+            )
+            return
 
-        last_results.append(classified_cells)
+        corners = self.drift.update(frame)
+        if corners is None:
+            return
+        self.logger.info(
+            f"Board moved {self.drift.drift():.1f}px since the start, corners corrected: {self.warp.corners} -> {corners}"
+        )
+        self.warp = TopDownWarp(corners)
+
+    def accept(self, image: MatLike) -> bool:
+        """Loads the warped frame, False if it is skipped by the frame gate."""
+        self.tracker.load(image)
+        # the gate scores the copy the cell extractor downsampled anyway
+        if self.frame_gate is None or self.frame_gate.accept(
+            self.tracker.extractor.downsampled()
+        ):
+            return True
+        # skipped frames are still shown, only the classification is saved
+        if self.renderer and self.renderer.due():
+            self.renderer.submit(image, self.game.board)
+        return False
 
-        canvas = add_stones_to_visual(visual_board.copy(), game.board)
-        complete = np.hstack((image, canvas))  # type: ignore #
-        cv2.imshow("Complete", complete)
+    def process(self, image: MatLike, labels: np.ndarray) -> None:
+        """Updates game and sgf with the classified cells of the next frame."""
+        if self.cell_filter:
+            labels = self.cell_filter.update(self.tracker.probabilities)
+        self.stability.update(labels)
 
-        # last_results are empty at the start and have to be filled up at the start
-        # this initialisation process is ignored and the recording only starts
-        # when enough frames exists to be compared
-        if len(last_results) < args.identical_frames:
-            continue
-        # remove oldest result
-        last_results.pop(0)
+        if self.renderer and self.renderer.due():
+            self.renderer.submit(image, self.game.board)
 
-        current_player, opponent_player = game.current_and_opponent_color()
+        # not enough identical frames => movement exists
+        # this also covers the start where not enough frames exist to be compared
+        if not self.stability.is_stable(self.identical_frames):
+            return
 
-        # not all the same => movement exists
-        if not all(r == classified_cells for r in last_results):
-            continue
+        current_player, opponent_player = self.game.current_and_opponent_color()
 
-        changes = diff_between_boards(game.board, classified_cells)
+        classified_cells = [Cell(label) for label in labels]
+        changes = diff_between_boards(self.game.board, classified_cells)
 
         if len(changes) == 0:
-            continue
+            return
+
+        if self.cell_filter:
+            confidence = self.cell_filter.confidence.reshape(GRID_SIZE, GRID_SIZE)
+            self.logger.debug(
+                "Confidence of changed cells: "
+                + ", ".join(
+                    f"{(x, y)} {confidence[y, x]:.2f}"
+                    for x, y in (c["position"] for c in changes)
+                )
+            )
 
         # single new move
         if (
             len(changes) == 1
             and changes[0]["current"] == Cell.EMPTY.value
             and changes[0]["new"] == current_player
+            and self.play_moves(
+                [(changes[0]["new"], changes[0]["position"])], "New Move"
+            )
         ):
-            position = changes[0]["position"]
-            if game.is_empty(position):
-                logger.info(f"New Move: {changes[0]['new']} - {position}")
-                game.add_move(*position)
-                sgf_child = add_move_to_sgf(sgf_child, str(changes[0]["new"]), position)
-                save_sgf_to_file(sgf_game)
-                continue
-            else:
-                logger.fatal(f"Illegal Move: {changes[0]['new']} - {position}")
-                exit(1)
+            return
 
         # two new moves
         if (
@@ -375,18 +489,14 @@ def main() -> None:
             and set([changes[0]["new"], changes[1]["new"]])
             == set([Cell.BLACK.value, Cell.WHITE.value])
         ):
-            logger.info("Two Moves")
+            self.logger.info("Two Moves")
             ordered_changes = (
                 changes if changes[0]["new"] == current_player else changes[::-1]
             )
-            for move in ordered_changes:
-                logger.info(f"Move: {move['new']} - {move['position']}")
-                game.add_move(*move["position"])
-                sgf_child = add_move_to_sgf(
-                    sgf_child, str(move["new"]), move["position"]
-                )
-            save_sgf_to_file(sgf_game)
-            continue
+            if self.play_moves(
+                [(move["new"], move["position"]) for move in ordered_changes]
+            ):
+                return
 
         # capture happended. One new move of current_player and 1+ removals of opponent
         moves_added = [c for c in changes if c["current"] == 0]
@@ -399,14 +509,11 @@ def main() -> None:
             and moves_removed[0]["current"] == opponent_player
         ):
             move = moves_added[0]
-            logger.info(f"Move (Capture): {move['new']} - {move['position']}")
-            game.add_move(*move["position"])
-            sgf_child = add_move_to_sgf(sgf_child, str(move["new"]), move["position"])
-            save_sgf_to_file(sgf_game)
-            continue
+            if self.play_moves([(move["new"], move["position"])], "Move (Capture)"):
+                return
 
         # multiple moves added
-        if katago_process:
+        if self.katago_process:
             valid_addition = all(c["current"] == Cell.EMPTY for c in changes)
             amount_player_stones = len(
                 [c["new"] for c in changes if c["new"] == current_player]
@@ -430,7 +537,7 @@ def main() -> None:
                 and 1 < len(moves_added) < MAX_DEPTH
                 and len(moves_removed) == 0
             ):
-                logger.info(
+                self.logger.info(
                     "Multiple new moves. Using katago to guess the correct sequence"
                 )
                 new_moves = []
@@ -438,18 +545,18 @@ def main() -> None:
                     new_moves.append((move["new"], move["position"]))
 
                 sequence = get_best_variation(
-                    katago_process,
-                    game.board,
+                    self.katago_process,
+                    self.game.packed,
                     new_moves,
                     current_player,
+                    pack_board(labels),
                 )
-                for move in sequence:
-                    color, position = move
-                    logger.info(f"Move: {color} - {position}")
-                    game.add_move(*position)
-                    sgf_child = add_move_to_sgf(sgf_child, str(color), position)
-                save_sgf_to_file(sgf_game)
-                continue
+                if not sequence:
+                    self.logger.warning(
+                        "No legal order of the new moves leads to the classified board"
+                    )
+                elif self.play_moves(sequence):
+                    return
 
         if len(moves_added) > 0 or len(moves_removed) > 0:
             # Chaos.
@@ -458,20 +565,274 @@ def main() -> None:
             #   B -> capture and stone was moved or wrongly recognized at the start
             #   C -> illegal moves
 
-            logger.warning(
+            self.logger.warning(
                 "Game State changed drastically! Unable to extract sequence and therefore updating the board as whole to the new state"
             )
-            game.board = [
+            self.game.board = [
                 classified_cells[i * GRID_SIZE : i * GRID_SIZE + GRID_SIZE]
                 for i in range(GRID_SIZE)
             ]
-            sgf_child = add_chaos_to_sgf(sgf_child, moves_added + moves_removed)
-            save_sgf_to_file(sgf_game)
+            self.sgf_child = add_chaos_to_sgf(
+                self.sgf_child, moves_added + moves_removed
+            )
+            self.save()
+
+    def play_moves(
+        self, moves: list[tuple[Cell, tuple[int, int]]], label: str = "Move"
+    ) -> bool:
+        """Plays the moves and adds them to the sgf, False if one of them is illegal.
+
+        An illegal move, e.g. of a misread board, takes back the moves before it, so
+        nothing is recorded and the caller falls back to updating the whole board.
+        The other boards keep recording.
+        """
+        for played, (color, position) in enumerate(moves):
+            try:
+                self.game.add_move(*position)
+            except AssertionError as e:
+                self.logger.error(f"Illegal Move: {color} - {position}: {e}")
+                for _ in range(played):
+                    self.game.undo()
+                return False
+
+        for color, position in moves:
+            self.logger.info(f"{label}: {color} - {position}")
+            self.sgf_child = add_move_to_sgf(self.sgf_child, str(color), position)
+        self.save()
+        return True
+
+    def stats(self) -> str:
+        stats = f"Capture stats: {self.grabber.stats()}, Classification stats: {self.tracker.stats()}"
+        if self.cell_filter:
+            stats += f", Smoothing stats: {self.cell_filter.stats()}"
+        if self.drift:
+            stats += f", Drift stats: {self.drift.stats()}"
+        if self.frame_gate:
+            stats += f", Frame gate stats: {self.frame_gate.stats()}"
+        return stats
+
+
+def open_source(source: int | Path, frame_buffer: int, frame_step: float):
+    if isinstance(source, Path):
+        grabber = FileFrameSource(source, frame_step)
+        logger.info(f"Using Source {source}")
+    else:
+        grabber = FrameGrabber(source, frame_buffer)
+        logger.info(f"Using Camera {source}")
+
+    if not grabber.open():
+        logger.error(
+            f"{'Source' if isinstance(source, Path) else 'Camera'} could not be openend"
+        )
+        exit(1)
+    return grabber.start()
+
+
+def default_corners_path(source: int | Path, amount_boards: int) -> Path:
+    if amount_boards == 1:
+        return BACKUP_PATH.joinpath("corners.json")
+    name = source.stem if isinstance(source, Path) else source
+    return BACKUP_PATH.joinpath(f"corners_{name}.json")
+
+
+def load_model(args: argparse.Namespace, profile: StartupProfile) -> ClassifierBackend:
+    backend = CLASSIFIERS[args.classifier]
+    with profile.measure(f"{args.classifier} import"):
+        backend.import_dependencies()
+
+    options = {"channels_last": args.channels_last} if args.classifier == "cnn" else {}
+    with profile.measure(f"{args.classifier} load"):
+        model = load_classifier(
+            args.classifier, args.model, args.classifier_threads, **options
+        )
+    with profile.measure(f"{args.classifier} warmup"):
+        warmup_ms = model.warmup()
+    logger.debug(
+        f"Classifier {args.classifier} warmed up: {warmup_ms:.2f} ms per board"
+    )
+    return model
+
+
+def start_katago(profile: StartupProfile):
+    logger.debug("Katago enabled. Trying to start it ...")
+    with profile.measure("katago start"):
+        process = start_katago_process()
+    with profile.measure("katago ready"):
+        ready = wait_until_ready(process)
+    if not ready:
+        logger.error("Katago exited during startup, recording without it")
+        return None
+    logger.debug("Katago started successfully")
+    return process
+
+
+def load_or_setup_corners(
+    args: argparse.Namespace, grabbers: list, corners_paths: list[Path]
+) -> list[list[list[int]]]:
+    all_corners = []
+    for grabber, corners_path in zip(grabbers, corners_paths):
+        corners = None
+        if args.use_saved_corners or args.corners:
+            corners = try_to_load_corners_from_file(corners_path)
+
+        if corners:
+            logger.debug(f"Corner backup found and loaded: {corners_path}")
+            all_corners.append(corners)
+            continue
+
+        detected, captured = None, None
+        if args.auto_corners:
+            captured = grabber.peek(timeout=AUTO_CORNERS_TIMEOUT)
+            if captured is not None:
+                detected = auto_detect_corners(captured.image)
+
+        if args.headless:
+            if detected is None or captured is None:
+                logger.error(
+                    "Headless mode requires saved (--use-saved-corners) or detected corners (--auto-corners)"
+                )
+                exit(1)
+            # nobody checks the corners, a grid shifted by a cell records a wrong game
+            score = grid_score(captured.image, detected)
+            if score < MIN_GRID_SCORE:
+                logger.error(
+                    f"Detected corners are not reliable (grid score {score:.2f} < {MIN_GRID_SCORE}). Set them up once without --headless and use --use-saved-corners"
+                )
+                exit(1)
+            corners = detected
+        else:
+            # TODO(2025-09-12 23:09:85): merge default and transformed into a single one
+            # Mouse movement will only be allowed up to border of default one
+            cv2.namedWindow("Default")
+            cv2.setMouseCallback("Default", default_mouse_callback)
+            cv2.namedWindow("Transformed")
+            corners = setup_corners(grabber, corners_path, detected)
+        all_corners.append(corners)
+    return all_corners
+
+
+def main() -> None:
+    args = get_args()
+    if args.identical_frames is None:
+        args.identical_frames = (
+            SMOOTHED_IDENTICAL_IMAGES if args.smoothing else AMOUNT_IDENTICAL_IMAGES
+        )
+
+    os.makedirs(BACKUP_PATH, exist_ok=True)
+    os.makedirs(RECORDING_PATH, exist_ok=True)
+
+    sources: list[int | Path] = args.source or args.camera
+    amount_boards = len(sources)
+    if args.corners and len(args.corners) != amount_boards:
+        logger.error("--corners requires one file per camera/source")
+        exit(1)
+    corners_paths = args.corners or [
+        default_corners_path(source, amount_boards) for source in sources
+    ]
+
+    grabbers = [
+        open_source(source, args.frame_buffer, args.frame_step) for source in sources
+    ]
+
+    # the model and KataGo load in the background while the corners are set up
+    profile = StartupProfile()
+    background = ThreadPoolExecutor(max_workers=2)
+    # a single model classifies the cells of all boards
+    model_future = background.submit(load_model, args, profile)
+    # a single KataGo process is shared by all boards
+    katago_future = (
+        background.submit(start_katago, profile) if args.use_katago else None
+    )
+
+    with profile.measure("corner setup"):
+        all_corners = load_or_setup_corners(args, grabbers, corners_paths)
+
+    with profile.measure("waiting for background"):
+        model = model_future.result()
+        katago_process = katago_future.result() if katago_future else None
+    background.shutdown()
+
+    recorders = []
+    for source, grabber, corners in zip(sources, grabbers, all_corners):
+        name = source.stem if isinstance(source, Path) else str(source)
+        single_board = amount_boards == 1
+        renderer = None
+        if not args.headless:
+            window_name = WINDOW_NAME if single_board else f"{WINDOW_NAME} {name}"
+            renderer = BoardRenderer(args.ui_fps, window_name).start()
+        sgf_name = f"{timestamp}.sgf" if single_board else f"{timestamp}_{name}.sgf"
+        recorders.append(
+            BoardRecorder(
+                name,
+                grabber,
+                corners,
+                RECORDING_PATH.joinpath(sgf_name),
+                args.identical_frames,
+                katago_process,
+                renderer,
+                prefix="" if single_board else f"[{name}] ",
+                cell_filter=(
+                    CellFilter(args.smoothing_alpha, args.commit_margin)
+                    if args.smoothing
+                    else None
+                ),
+                drift_interval=args.drift_interval if args.track_drift else None,
+                drift_threshold=args.drift_threshold,
+                frame_gate=FrameGate() if args.frame_gate else None,
+            )
+        )
+
+    profile.mark("recording start")
+    if args.startup_profile:
+        logger.info(f"{'startup stage':<24}{'start':>9}{'end':>9}{'took':>9}")
+        for line in profile.report():
+            logger.info(line)
+
+    # without window there are no keys, Ctrl+C stops the recording instead
+    stop_requested = threading.Event()
+    if args.headless:
+        signal.signal(signal.SIGINT, lambda *_: stop_requested.set())
+
+    active = list(recorders)
+    while active and not stop_requested.is_set():
+        if not args.headless:
+            for recorder in recorders:
+                assert recorder.renderer
+                recorder.renderer.show()
+            key = cv2.waitKey(1) & 0xFF
+            if key in [ord("q"), 27]:  # 27 = ESC
+                break
+
+        ready, images = [], []
+        for recorder in list(active):
+            captured = recorder.grabber.read(timeout=FRAME_TIMEOUT)
+            if captured is None:
+                if recorder.grabber.exhausted:
+                    recorder.logger.info("All frames of the source are processed")
+                    active.remove(recorder)
+                continue
+            recorder.track(captured.image)
+            image = recorder.warp(captured.image)
+            if not recorder.accept(image):
+                continue
+            ready.append(recorder)
+            images.append(image)
+
+        if not ready:
+            continue
 
-    cap.release()
+        all_labels = classify_boards(model, [recorder.tracker for recorder in ready])
+        for recorder, image, labels in zip(ready, images, all_labels):
+            recorder.process(image, labels)
 
-    save_sgf_to_file(sgf_game)
+    for recorder in recorders:
+        recorder.grabber.stop()
+        if recorder.renderer:
+            recorder.renderer.stop()
+        recorder.logger.debug(recorder.stats())
+        recorder.save()
 
+    logger.debug(f"Classifier stats: {model.stats()}")
     if katago_process:
         katago_process.terminate()
 
@@ -479,6 +840,5 @@ def main() -> None:
 if __name__ == "__main__":
     default_mouse = [0, 0]
     timestamp = str(datetime.now().strftime("%d%m%Y%H%M%S"))
-    corners_path = Path.joinpath(BACKUP_PATH, "corners.json")
     logger = get_color_logger()
     main()
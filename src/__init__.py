@@ -7,6 +7,7 @@ SGF_PATH = ROOT_DIR.joinpath("sgf")
 KATAGO_PATH = ROOT_DIR.joinpath("katago")
 BACKUP_PATH = ROOT_DIR.joinpath("backup")
 RECORDING_PATH = ROOT_DIR.joinpath("recording")
+WEIGHTS_PATH = ROOT_DIR.joinpath("weights")
 
 
 GRID_SIZE = 19
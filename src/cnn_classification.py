@@ -0,0 +1,41 @@
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+
+class StoneClassifactionModel(nn.Module):
+    def __init__(self):
+        super(StoneClassifactionModel, self).__init__()
+        self.conv1 = nn.Conv2d(3, 16, kernel_size=3, padding=1)
+        self.pool = nn.MaxPool2d(kernel_size=2, stride=2)
+        self.conv2 = nn.Conv2d(16, 32, kernel_size=3, padding=1)
+        self.fc1 = nn.Linear(32 * 16 * 16, 128)
+        self.fc2 = nn.Linear(128, 3)
+
+    def forward(self, x):
+        x = self.pool(F.relu(self.conv1(x)))
+        x = self.pool(F.relu(self.conv2(x)))
+        x = torch.flatten(x, 1)  # view() fails for channels last tensors
+        x = F.relu(self.fc1(x))
+        x = self.fc2(x)
+        return x
+
+
+def quantize_cnn(model: StoneClassifactionModel) -> nn.Module:
+    """Dynamic int8 quantization of the linear layers, fc1 holds most of the weights.
+
+    Convolutions are not supported by dynamic quantization and stay float32.
+    """
+    return torch.ao.quantization.quantize_dynamic(
+        model.eval(), {nn.Linear}, dtype=torch.qint8
+    )
+
+
+def load_cnn(path) -> nn.Module:
+    """Loads float32 or quantized (see quantize_cnn) weights."""
+    state_dict = torch.load(path, map_location="cpu")
+    model = StoneClassifactionModel()
+    if any("_packed_params" in key for key in state_dict):
+        model = quantize_cnn(model)
+    model.load_state_dict(state_dict)
+    return model
@@ -0,0 +1,110 @@
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src import CELL_SIZE, GRID_SIZE, HALF_CELL_SIZE
+from src.utils.cell_extractor import CellExtractor
+from src.utils.classifiers import RandomForestBackend, load_classifier
+from src.utils.cv2_helper import blur_and_sharpen, convert_to_top_down
+from src.utils.dataset import LabelledImage, labelled_images
+
+REPETITIONS = 100
+
+
+def list_comprehension_extraction(frame) -> np.ndarray:
+    """Cell extraction as it was done in main.classify_all_cells."""
+    low_offsets = np.arange(0, GRID_SIZE) * CELL_SIZE - HALF_CELL_SIZE
+    high_offsets = np.arange(1, GRID_SIZE + 1) * CELL_SIZE + HALF_CELL_SIZE
+
+    low_offsets = np.clip(low_offsets, 0, frame.shape[0])
+    high_offsets = np.clip(high_offsets, 0, frame.shape[1])
+
+    return np.array(
+        [
+            cv2.resize(
+                frame[
+                    low_offsets[y] : high_offsets[y], low_offsets[x] : high_offsets[x]
+                ],
+                (CELL_SIZE, CELL_SIZE),
+            ).flatten()
+            for y in range(GRID_SIZE)
+            for x in range(GRID_SIZE)
+        ]
+    )
+
+
+def top_down(labelled: LabelledImage) -> np.ndarray:
+    return blur_and_sharpen(convert_to_top_down(labelled.image, labelled.corners))
+
+
+def border_accuracy(extraction) -> tuple[float, float]:
+    """Accuracy of the random forest on the border and the inner cells of all labelled images."""
+    classifier = load_classifier("rf")
+    is_border = np.zeros((GRID_SIZE, GRID_SIZE), dtype=bool)
+    is_border[[0, -1]] = is_border[:, [0, -1]] = True
+    is_border = is_border.reshape(-1)
+
+    correct, total = np.zeros(2), np.zeros(2)
+    for labelled in labelled_images():
+        hits = classifier.predict(extraction(top_down(labelled))) == labelled.labels
+        correct += hits[is_border].sum(), hits[~is_border].sum()
+        total += is_border.sum(), (~is_border).sum()
+    border, inner = correct / total
+    return border, inner
+
+
+def measure(function, frame) -> float:
+    start = time.perf_counter()
+    for _ in range(REPETITIONS):
+        function(frame)
+    return (time.perf_counter() - start) / REPETITIONS * 1000
+
+
+def main():
+    # not every labelled image is part of the repository
+    frame = top_down(next(labelled_images()))
+    extractor = CellExtractor()
+
+    old = list_comprehension_extraction(frame)
+    new = extractor(frame)
+
+    # border cells are no longer clipped, so only the inner cells are comparable
+    inner = np.array(
+        [
+            y * GRID_SIZE + x
+            for y in range(1, GRID_SIZE - 1)
+            for x in range(1, GRID_SIZE - 1)
+        ]
+    )
+    difference = np.abs(old[inner].astype(int) - new[inner].astype(int)).max()
+
+    old_ms = measure(list_comprehension_extraction, frame)
+    new_ms = measure(extractor, frame)
+
+    print(f"Max difference of inner cells: {difference}")
+    # border cells were clipped and stretched when the classifier was trained
+    if RandomForestBackend.default_path.exists():
+        for name, extraction in (
+            ("List comprehension", list_comprehension_extraction),
+            ("CellExtractor", extractor),
+        ):
+            border, inner = border_accuracy(extraction)
+            print(
+                f"{name} accuracy: border cells {border:.3f}, inner cells {inner:.3f}"
+            )
+    else:
+        print(
+            f"No random forest at {RandomForestBackend.default_path}, accuracy skipped"
+        )
+    print(f"List comprehension: {old_ms:.2f} ms/frame")
+    print(f"CellExtractor:      {new_ms:.2f} ms/frame")
+    print(f"Speedup:            {old_ms / new_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
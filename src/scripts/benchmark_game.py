@@ -0,0 +1,185 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src import GRID_SIZE, SGF_PATH
+from src.utils.game import (
+    AMOUNT_POINTS,
+    BLACK,
+    EMPTY,
+    NEIGHBORS,
+    WHITE,
+    Game,
+    legal_move_mask,
+    sgf_moves,
+    zobrist_hash,
+)
+
+REPETITIONS = 5
+# moves between two comparisons of the legal moves with trying every point
+LEGAL_MOVES_INTERVAL = 10
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Replays all sgf files with the game engine, checks its chains against a flood fill and measures the speed"
+    )
+    parser.add_argument("--sgf", type=Path, default=SGF_PATH)
+    parser.add_argument("--repetitions", type=int, default=REPETITIONS)
+    return parser.parse_args()
+
+
+def flood_fill(stones: np.ndarray, position: int) -> tuple[list[int], set[int]]:
+    color = stones[position]
+    group, seen, liberties = [position], {position}, set()
+    for index in group:
+        for neighbor in NEIGHBORS[index]:
+            if neighbor in seen:
+                continue
+            if stones[neighbor] == color:
+                group.append(neighbor)
+                seen.add(neighbor)
+            elif stones[neighbor] == EMPTY:
+                liberties.add(neighbor)
+    return group, liberties
+
+
+def flood_fill_move(stones: np.ndarray, position: int, color: int) -> None:
+    """A move as it was done before the chains, a flood fill per neighbor."""
+    stones[position] = color
+    for neighbor in NEIGHBORS[position]:
+        if stones[neighbor] in (EMPTY, color):
+            continue
+        group, liberties = flood_fill(stones, neighbor)
+        if not liberties:
+            stones[group] = EMPTY
+    assert flood_fill(stones, position)[1], "Move would lead to suicide"
+
+
+def flood_fill_replay(games: list[list[tuple[int, int]]]) -> None:
+    for moves in games:
+        stones = np.zeros(AMOUNT_POINTS, dtype=np.int8)
+        for index, (x, y) in enumerate(moves):
+            flood_fill_move(stones, y * GRID_SIZE + x, (BLACK, WHITE)[index & 1])
+
+
+def game_replay(games: list[list[tuple[int, int]]]) -> None:
+    for moves in games:
+        game = Game()
+        for move in moves:
+            game.add_move(*move)
+
+
+def check_chains(game: Game) -> None:
+    """Compares every chain and the hash of the game with its board."""
+    assert game.hash == zobrist_hash(game.stones), "Hash differs"
+    checked = set()
+    for point in np.flatnonzero(game.stones):
+        if point in checked:
+            continue
+        group, liberties = flood_fill(game.stones, point)
+        chain = game.chain[point]
+        assert set(game.chain_stones[chain]) == set(group), f"Chain of {point} differs"
+        assert game.chain_liberties[chain] == liberties, f"Liberties of {point} differ"
+        checked.update(group)
+    assert len(checked) == len(game.chain) - game.chain.count(-1), (
+        "Empty point in chain"
+    )
+
+
+def check_legal_moves(game: Game) -> None:
+    """Compares the legal move mask with playing and undoing every point."""
+    tried = np.zeros((GRID_SIZE, GRID_SIZE), dtype=bool)
+    for y in range(GRID_SIZE):
+        for x in range(GRID_SIZE):
+            try:
+                game.add_move(x, y)
+            except AssertionError:
+                continue
+            game.undo()
+            tried[y, x] = True
+    assert np.array_equal(game.legal_moves(), tried), "Legal moves differ"
+
+
+def check_consistency(games: list[list[tuple[int, int]]]) -> int:
+    """Checks boards, chains and hashes after every move and every undo.
+
+    The legal moves are checked every LEGAL_MOVES_INTERVAL moves.
+    """
+    checked = 0
+    for moves in games:
+        game = Game(superko=True)
+        stones = np.zeros(AMOUNT_POINTS, dtype=np.int8)
+        boards = [stones.copy()]
+        for index, (x, y) in enumerate(moves):
+            game.add_move(x, y)
+            flood_fill_move(stones, y * GRID_SIZE + x, (BLACK, WHITE)[index & 1])
+            assert np.array_equal(game.stones, stones), (
+                f"Board differs after move {index}"
+            )
+            check_chains(game)
+            if index % LEGAL_MOVES_INTERVAL == 0:
+                check_legal_moves(game)
+            boards.append(stones.copy())
+            checked += 1
+
+        for index, board in enumerate(boards):
+            assert np.array_equal(game.board_at(index), board), "Replayed board differs"
+        for board in reversed(boards[:-1]):
+            game.undo()
+            assert np.array_equal(game.stones, board), "Board differs after undo"
+            check_chains(game)
+    return checked
+
+
+def measure(function, games, repetitions: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        function(games)
+    return (time.perf_counter() - start) / repetitions
+
+
+def main():
+    args = get_args()
+    paths = sorted(args.sgf.glob("*.sgf"))
+    assert paths, f"No sgf files found in {args.sgf}"
+    games = [sgf_moves(path) for path in paths]
+    amount_moves = sum(len(moves) for moves in games)
+
+    checked = check_consistency(games)
+    print(
+        f"Consistent with flood fill: {checked} moves of {len(games)} games and their undo"
+    )
+
+    flood_fill_s = measure(flood_fill_replay, games, args.repetitions)
+    game_s = measure(game_replay, games, args.repetitions)
+    print(
+        f"Flood fill: {flood_fill_s * 1000:.0f} ms ({flood_fill_s / amount_moves * 1e6:.1f} us/move)"
+    )
+    print(
+        f"Chains:     {game_s * 1000:.0f} ms ({game_s / amount_moves * 1e6:.1f} us/move)"
+    )
+    print(f"Speedup:    {flood_fill_s / game_s:.1f}x")
+
+    boards, colors = [], []
+    for moves in games:
+        game = Game()
+        for move in moves:
+            game.add_move(*move)
+            boards.append(game.board.copy())
+            colors.append(game.current_and_opponent_color()[0])
+    start = time.perf_counter()
+    legal_move_mask(np.array(boards), np.array(colors))
+    batch_s = time.perf_counter() - start
+    print(
+        f"Legal moves of {len(boards)} boards: {batch_s * 1000:.0f} ms ({batch_s / len(boards) * 1e6:.1f} us/board)"
+    )
+
+
+if __name__ == "__main__":
+    main()
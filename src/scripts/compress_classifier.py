@@ -0,0 +1,121 @@
+import argparse
+import pickle
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+from sklearn.model_selection import GroupShuffleSplit
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src import WEIGHTS_PATH
+from src.cnn_classification import load_cnn, quantize_cnn
+from src.stone_classification import load_rf
+from src.utils.cell_extractor import AMOUNT_CELLS
+from src.utils.classifiers import CnnBackend, RandomForestBackend, load_classifier
+from src.utils.compression import prune_forest
+from src.utils.custom_logger import get_color_logger
+from src.utils.dataset import cell_dataset
+
+logger = get_color_logger()
+
+REPETITIONS = 10
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compresses the stone classifiers and compares them with the originals"
+    )
+    parser.add_argument("--rf", type=Path, default=RandomForestBackend.default_path)
+    parser.add_argument("--cnn", type=Path, default=CnnBackend.default_path)
+    parser.add_argument(
+        "--max-depth", type=int, default=10, help="Depth the forest's trees are cut at"
+    )
+    parser.add_argument(
+        "--n-estimators",
+        type=int,
+        default=None,
+        help="Amount of trees kept. Default keeps all",
+    )
+    parser.add_argument(
+        "--test-size",
+        type=float,
+        default=0.3,
+        help="Share of images held out, same split as src/scripts/train_classifier.py. Models trained on all images score too high",
+    )
+    parser.add_argument("--output", type=Path, default=WEIGHTS_PATH)
+    return parser.parse_args()
+
+
+def compress_rf(path: Path, output: Path, max_depth: int, n_estimators: int | None):
+    model = prune_forest(load_rf(path), max_depth, n_estimators)
+    with open(output, "wb") as f:
+        pickle.dump(model, f)
+
+
+def compress_cnn(path: Path, output: Path):
+    torch.save(quantize_cnn(load_cnn(path)).state_dict(), output)
+
+
+def evaluate(name: str, path: Path, X: np.ndarray, y: np.ndarray) -> tuple:
+    """Size in MB, load ms, ms per frame and accuracy of a model file."""
+    start = time.perf_counter()
+    backend = load_classifier(name, path)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    backend.warmup()
+    frame = X[:AMOUNT_CELLS]
+    start = time.perf_counter()
+    for _ in range(REPETITIONS):
+        backend.predict(frame)
+    frame_ms = (time.perf_counter() - start) / REPETITIONS * 1000
+
+    predictions = np.concatenate(
+        [
+            backend.predict(X[i : i + AMOUNT_CELLS])
+            for i in range(0, len(X), AMOUNT_CELLS)
+        ]
+    )
+    accuracy = float((predictions == y).mean())
+    return path.stat().st_size / 1e6, load_ms, frame_ms, accuracy
+
+
+def main():
+    args = get_args()
+    args.output.mkdir(parents=True, exist_ok=True)
+
+    X, y, groups = cell_dataset()
+    _, test = next(
+        GroupShuffleSplit(n_splits=1, test_size=args.test_size, random_state=42).split(
+            X, y, groups
+        )
+    )
+    X, y = X[test], y[test]
+
+    models = []
+    if args.rf.exists():
+        pruned = args.output.joinpath(f"{args.rf.stem}_depth{args.max_depth}.pkl")
+        compress_rf(args.rf, pruned, args.max_depth, args.n_estimators)
+        models += [("rf", args.rf), ("rf", pruned)]
+    else:
+        logger.warning(f"Random forest not found: {args.rf}")
+
+    if args.cnn.exists():
+        quantized = args.output.joinpath(f"{args.cnn.stem}_int8.pth")
+        compress_cnn(args.cnn, quantized)
+        models += [("cnn", args.cnn), ("cnn", quantized)]
+    else:
+        logger.warning(f"CNN weights not found: {args.cnn}")
+
+    print(f"{'model':<40}{'size MB':>9}{'load ms':>9}{'ms/frame':>10}{'accuracy':>10}")
+    for name, path in models:
+        size, load_ms, frame_ms, accuracy = evaluate(name, path, X, y)
+        print(
+            f"{path.name:<40}{size:>9.2f}{load_ms:>9.1f}{frame_ms:>10.2f}{accuracy:>10.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
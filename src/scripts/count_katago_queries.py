@@ -0,0 +1,62 @@
+import argparse
+import json
+import sys
+from collections import Counter
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src import DATA_PATH, SGF_PATH
+from src.utils.game import Game, sgf_moves
+from src.utils.katago_helper import PrefixTree, VariationSearch
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Counts the positions katago analyses per variation and with the prefix tree for the cases of missing moves"
+    )
+    parser.add_argument(
+        "--cases", type=Path, default=DATA_PATH.joinpath("katago_results.json")
+    )
+    parser.add_argument("--sgf", type=Path, default=SGF_PATH)
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    with open(args.cases) as f:
+        cases = json.load(f)
+
+    before, after = Counter(), Counter()
+    for case in cases:
+        moves = sgf_moves(args.sgf.joinpath(f"{case['game_id']}.sgf"))
+        game = Game()
+        for move in moves[: case["start"]]:
+            game.add_move(*move)
+        board, current_player = game.packed, game.current_and_opponent_color()[0]
+
+        missing = []
+        for move in moves[case["start"] : case["start"] + case["amount"]]:
+            missing.append((game.current_and_opponent_color()[0], move))
+            game.add_move(*move)
+
+        search = VariationSearch(board, missing, current_player, game.packed)
+        tree = PrefixTree()
+        for variation in search:
+            tree.add(variation)
+        before[case["amount"]] += tree.variations * case["amount"]
+        after[case["amount"]] += len(tree)
+
+    print(f"{'moves':>5} {'before':>8} {'after':>8} {'saving':>7}")
+    for amount in sorted(before):
+        print(
+            f"{amount:>5} {before[amount]:>8} {after[amount]:>8} {before[amount] / after[amount]:>6.1f}x"
+        )
+    total_before, total_after = sum(before.values()), sum(after.values())
+    print(
+        f"{'all':>5} {total_before:>8} {total_after:>8} {total_before / total_after:>6.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
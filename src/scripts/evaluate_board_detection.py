@@ -0,0 +1,102 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src import GRID_SIZE
+from src.utils.board_detection import MIN_GRID_SCORE, detect_corners, grid_score
+from src.utils.dataset import LABELLED_CORNERS_PATH, labelled_images
+
+THRESHOLDS = (0.25, 0.5, 1.0)
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compares the automatic corner detection with the hand labelled corners"
+    )
+    parser.add_argument("--corners", type=Path, default=LABELLED_CORNERS_PATH)
+    parser.add_argument(
+        "--verbose", action="store_true", help="Prints the error of every image"
+    )
+    return parser.parse_args()
+
+
+def corner_error(detected: list, labelled: list) -> float:
+    """Mean distance between the corners in pixels.
+
+    Which side of the board black sits on is not visible in a photo, so the
+    detected corners are compared in the rotation that fits the labels best.
+    """
+    detected, labelled = np.array(detected), np.array(labelled)
+    return min(
+        float(
+            np.linalg.norm(np.roll(detected, shift, axis=0) - labelled, axis=1).mean()
+        )
+        for shift in range(4)
+    )
+
+
+def cell_size(corners: list) -> float:
+    corners = np.array(corners)
+    sides = np.linalg.norm(corners - np.roll(corners, 1, axis=0), axis=1)
+    return float(sides.mean() / GRID_SIZE)
+
+
+def main():
+    args = get_args()
+
+    errors, cell_errors, scores, durations, failed = [], [], [], [], []
+    for labelled in labelled_images(args.corners):
+        start = time.perf_counter()
+        detected = detect_corners(labelled.image)
+        durations.append((time.perf_counter() - start) * 1000)
+
+        name = f"{labelled.path.parent.name}/{labelled.path.name}"
+        if detected is None:
+            failed.append(name)
+            if args.verbose:
+                print(f"{name:<60}{'no grid found':>24}")
+            continue
+
+        error = corner_error(detected, labelled.corners)
+        errors.append(error)
+        cell_errors.append(error / cell_size(labelled.corners))
+        scores.append(grid_score(labelled.image, detected))
+        if args.verbose:
+            print(
+                f"{name:<60}{error:>10.1f}px{cell_errors[-1]:>10.2f}cells{scores[-1]:>8.2f}"
+            )
+
+    amount = len(durations)
+    assert amount > 0, f"No labelled images found for {args.corners}"
+    errors, cell_errors, scores = (
+        np.array(errors),
+        np.array(cell_errors),
+        np.array(scores),
+    )
+
+    print(f"images          {amount}")
+    print(f"no grid found   {len(failed)}")
+    if len(errors):
+        print(
+            f"median error    {np.median(errors):.1f}px {np.median(cell_errors):.2f} cells"
+        )
+    for threshold in THRESHOLDS:
+        share = (cell_errors <= threshold).sum() / amount
+        print(f"<= {threshold:<4} cells   {share:.1%}")
+    # detections headless mode uses without a check by hand
+    accepted = scores >= MIN_GRID_SCORE
+    print(f"grid score >= {MIN_GRID_SCORE} {accepted.sum() / amount:.1%}")
+    if accepted.any():
+        print(f"  worst error   {cell_errors[accepted].max():.2f} cells")
+    print(
+        f"runtime         mean {np.mean(durations):.0f}ms max {np.max(durations):.0f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src import WEIGHTS_PATH
+from src.stone_classification import load_rf
+from src.utils.cell_extractor import AMOUNT_CELLS, CellExtractor
+from src.utils.cv2_helper import blur_and_sharpen, convert_to_top_down
+from src.utils.dataset import labelled_images
+
+# typical amount of changed cells per frame during a game
+DIRTY_CELLS = np.array([60, 61, 79])
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compares full image and cell local preprocessing"
+    )
+    parser.add_argument(
+        "--model",
+        type=Path,
+        default=WEIGHTS_PATH.joinpath("random_forest_model.pkl"),
+        help="Pickled random forest",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    model = load_rf(args.model)
+
+    full_image_extractor = CellExtractor()
+    cell_local_extractor = CellExtractor(preprocess=True)
+    all_cells = np.arange(AMOUNT_CELLS)
+
+    timings = {"full image": [], "cell local (all)": [], "cell local (3 cells)": []}
+    correct = {"full image": 0, "cell local (all)": 0}
+    total = 0
+
+    for labelled in labelled_images():
+        top_down = convert_to_top_down(labelled.image, labelled.corners)
+
+        start = time.perf_counter()
+        full_image_batch = full_image_extractor(blur_and_sharpen(top_down))
+        timings["full image"].append(time.perf_counter() - start)
+        predictions = model.predict(full_image_batch)
+        correct["full image"] += int((predictions == labelled.labels).sum())
+
+        start = time.perf_counter()
+        cell_local_extractor.load(top_down)
+        cell_local_batch = cell_local_extractor.extract(all_cells)
+        timings["cell local (all)"].append(time.perf_counter() - start)
+        predictions = model.predict(cell_local_batch)
+        correct["cell local (all)"] += int((predictions == labelled.labels).sum())
+
+        start = time.perf_counter()
+        cell_local_extractor.load(top_down)
+        cell_local_extractor.extract(DIRTY_CELLS)
+        timings["cell local (3 cells)"].append(time.perf_counter() - start)
+
+        total += AMOUNT_CELLS
+
+    print(f"{'preprocessing':<22}{'accuracy':>10}{'ms/frame':>10}")
+    for name, durations in timings.items():
+        accuracy = f"{correct[name] / total:.4f}" if name in correct else "-"
+        print(f"{name:<22}{accuracy:>10}{np.mean(durations) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
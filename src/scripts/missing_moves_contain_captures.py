@@ -1,27 +1,19 @@
 import sys
 from pathlib import Path
 
+import numpy as np
 from icecream import ic
-from sgfmill import sgf
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from src import SGF_PATH
-from src.utils.game import Game
-
+from src.utils.replay import replay_sgf
 
 filename = SGF_PATH.joinpath("1.sgf")
-game = Game()
-
-with open(filename, "rb") as f:
-    main_sequence = sgf.Sgf_game.from_bytes(f.read()).get_main_sequence()
+game = replay_sgf(filename)
 
-last_captures = 0
+# black plays the even moves and captures white stones
+captured_white = np.cumsum(game.captures * (np.arange(len(game.captures)) % 2 == 0))
+captured_black = np.cumsum(game.captures) - captured_white
 
-for index, node in enumerate(main_sequence):
-    _, move = node.get_move()
-    if move:
-        game.add_move(*move)
-        new_amount_captures = game.captured_black + game.captured_white
-        if new_amount_captures != last_captures:
-            last_captures = new_amount_captures
-            ic(index, game.captured_black, game.captured_white)
+for index in np.flatnonzero(game.captures):
+    ic(index, captured_black[index], captured_white[index])
@@ -0,0 +1,118 @@
+import argparse
+import pickle
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import GroupShuffleSplit
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import FunctionTransformer
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src import WEIGHTS_PATH
+from src.utils.cell_extractor import AMOUNT_CELLS
+from src.utils.dataset import cell_dataset
+from src.utils.features import FEATURE_EXTRACTORS
+
+REPETITIONS = 20
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Trains a random forest for each feature set and compares them"
+    )
+    parser.add_argument(
+        "--features",
+        nargs="+",
+        choices=list(FEATURE_EXTRACTORS),
+        default=list(FEATURE_EXTRACTORS),
+        help="Feature sets to train",
+    )
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument(
+        "--test-size",
+        type=float,
+        default=0.3,
+        help="Share of images (not cells) held out for testing",
+    )
+    parser.add_argument("--output", type=Path, default=WEIGHTS_PATH)
+    return parser.parse_args()
+
+
+def frame_latency(function, frame: np.ndarray) -> float:
+    """Milliseconds function takes for all cells of a single frame."""
+    start = time.perf_counter()
+    for _ in range(REPETITIONS):
+        function(frame)
+    return (time.perf_counter() - start) / REPETITIONS * 1000
+
+
+def main():
+    args = get_args()
+    args.output.mkdir(parents=True, exist_ok=True)
+
+    X, y, groups = cell_dataset()
+    # split by image, cells of the same photo are too similar for a fair test
+    train, test = next(
+        GroupShuffleSplit(n_splits=1, test_size=args.test_size, random_state=42).split(
+            X, y, groups
+        )
+    )
+    print(f"Train cells: {len(train)}, Test cells: {len(test)}")
+
+    results = []
+    for name in args.features:
+        features = FEATURE_EXTRACTORS[name]
+        model = make_pipeline(
+            FunctionTransformer(features),
+            RandomForestClassifier(
+                n_estimators=args.n_estimators,
+                max_depth=args.max_depth,
+                class_weight="balanced",
+                random_state=42,
+                n_jobs=-1,
+            ),
+        )
+        model.fit(X[train], y[train])
+        accuracy = accuracy_score(y[test], model.predict(X[test]))
+
+        # main.py classifies single threaded
+        model[-1].set_params(n_jobs=None)
+        frame = X[test][:AMOUNT_CELLS]
+        feature_ms = frame_latency(features, frame)
+        total_ms = frame_latency(model.predict, frame)
+
+        serialized = pickle.dumps(model)
+        path = args.output.joinpath(f"random_forest_{name}.pkl")
+        with open(path, "wb") as f:
+            f.write(serialized)
+
+        results.append(
+            (
+                name,
+                features(frame[:1]).shape[1],
+                accuracy,
+                feature_ms,
+                total_ms,
+                len(serialized) / 1e6,
+            )
+        )
+
+    print(
+        f"{'features':<10}{'amount':>8}{'accuracy':>10}{'features ms':>13}"
+        f"{'total ms':>10}{'size MB':>9}"
+    )
+    for name, amount, accuracy, feature_ms, total_ms, size in results:
+        print(
+            f"{name:<10}{amount:>8}{accuracy:>10.4f}{feature_ms:>13.2f}"
+            f"{total_ms:>10.2f}{size:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,508 @@
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from src import GRID_SIZE
+
+# longer side of the image the grid is searched in
+DETECTION_SIZE = 800
+# longer side of the image the corners are refined in
+REFINE_SIZE = 1600
+MIN_SEGMENT_LENGTH = 8
+MIN_SEGMENTS = 20
+# both line directions of the grid, a segment belongs to the closer one
+FAMILY_TOLERANCE = np.radians(30)
+FAMILY_SEPARATION = np.radians(40)
+RANSAC_ITERATIONS = 300
+# distance of a segment's endpoint to the line through its midpoint and the
+# vanishing point, relative to half the image size
+VANISHING_POINT_TOLERANCE = 1 / 400
+# the board is where segments of both directions are dense
+DENSITY_BLOCK = 25
+DENSITY_THRESHOLD = 0.25
+CANVAS_SIZE = 800
+# distance between the outer grid line and the edge of the board in cells
+EDGE_MARGINS = np.arange(0.45, 0.95, 0.05)
+EDGE_WEIGHT = 1.0
+# amount of the worst grid lines which are scored twice, so a few strong lines
+# (e.g. the edges of stones) can not outweigh the rest of the lattice
+WORST_LINES = 6
+TOP_DOWN_SIZE = 608
+REFINE_SEARCH = 0.3
+REFINE_ITERATIONS = 2
+MIN_LINE_POINTS = 5
+# share of the grid lines which have to stand out in the top down view. Detections
+# more than a cell off the labelled corners scored at most 0.76, see
+# evaluate_board_detection.py
+MIN_GRID_SCORE = 0.9
+
+
+def _clahe(gray: MatLike) -> MatLike:
+    return cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+
+
+def _apply(matrix: np.ndarray, points: np.ndarray) -> np.ndarray:
+    points = np.c_[points, np.ones(len(points))] @ matrix.T
+    return points[:, :2] / points[:, 2:3]
+
+
+def _lengths(segments: np.ndarray) -> np.ndarray:
+    return np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1])
+
+
+def line_segments(gray: MatLike) -> np.ndarray:
+    """(N, 4) x1, y1, x2, y2 of the straight segments in the image."""
+    detected = cv2.createLineSegmentDetector().detect(gray)[0]
+    if detected is None:
+        return np.zeros((0, 4), dtype=np.float32)
+    # OpenCV 4 returns (N, 1, 4), OpenCV 5 (N, 4)
+    segments = detected.reshape(-1, 4)
+    return segments[_lengths(segments) >= MIN_SEGMENT_LENGTH]
+
+
+def split_families(segments: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Masks of the two dominant directions in a length weighted angle histogram."""
+    angles = (
+        np.arctan2(segments[:, 3] - segments[:, 1], segments[:, 2] - segments[:, 0])
+        % np.pi
+    )
+    histogram, _ = np.histogram(
+        angles, bins=180, range=(0, np.pi), weights=_lengths(segments)
+    )
+    # circular smoothing, 0 and 180 degrees are the same direction
+    histogram = np.convolve(
+        np.r_[histogram[-3:], histogram, histogram[:3]], np.ones(7) / 7, "same"
+    )[3:-3]
+
+    def distance(angle, center):
+        return np.abs((angle - center + np.pi / 2) % np.pi - np.pi / 2)
+
+    bins = (np.arange(180) + 0.5) * np.pi / 180
+    first = bins[np.argmax(histogram)]
+    second = bins[
+        np.argmax(np.where(distance(bins, first) >= FAMILY_SEPARATION, histogram, 0))
+    ]
+    to_first, to_second = distance(angles, first), distance(angles, second)
+    in_first = (to_first < FAMILY_TOLERANCE) & (to_first < to_second)
+    in_second = (to_second < FAMILY_TOLERANCE) & ~in_first
+    return in_first, in_second
+
+
+def vanishing_point(
+    segments: np.ndarray, rng: np.random.Generator
+) -> tuple[np.ndarray, np.ndarray]:
+    """Homogeneous vanishing point of the segments (RANSAC) and its inlier mask."""
+    starts = np.c_[segments[:, :2], np.ones(len(segments))]
+    ends = np.c_[segments[:, 2:], np.ones(len(segments))]
+    lines = np.cross(starts, ends)
+    lines /= np.linalg.norm(lines[:, :2], axis=1, keepdims=True)
+    midpoints = (starts + ends) / 2
+    lengths = _lengths(segments)
+
+    best_inliers, best_score = np.ones(len(segments), dtype=bool), -1.0
+    pairs = rng.choice(len(segments), (RANSAC_ITERATIONS, 2), p=lengths / lengths.sum())
+    for first, second in pairs:
+        point = np.cross(lines[first], lines[second])
+        if np.linalg.norm(point) < 1e-12:
+            continue
+        through = np.cross(midpoints, point / np.linalg.norm(point))
+        through /= np.linalg.norm(through[:, :2], axis=1, keepdims=True) + 1e-12
+        distances = np.abs(
+            (through[:, :2] * segments[:, :2]).sum(axis=1) + through[:, 2]
+        )
+        inliers = distances < VANISHING_POINT_TOLERANCE
+        score = lengths[inliers].sum()
+        if score > best_score:
+            best_inliers, best_score = inliers, score
+
+    # least squares point closest to all inlier lines, long segments count more
+    _, _, vt = np.linalg.svd(lines[best_inliers] * lengths[best_inliers, None])
+    return vt[-1], best_inliers
+
+
+def _density(segments: np.ndarray, shape: tuple[int, int]) -> np.ndarray:
+    density = np.zeros(
+        (shape[0] // DENSITY_BLOCK + 1, shape[1] // DENSITY_BLOCK + 1), dtype=np.float32
+    )
+    blocks = ((segments[:, :2] + segments[:, 2:]) / 2 / DENSITY_BLOCK).astype(int)
+    np.add.at(density, (blocks[:, 1], blocks[:, 0]), _lengths(segments))
+    return cv2.GaussianBlur(density, (0, 0), 1)
+
+
+def board_mask(
+    segments: np.ndarray, families: tuple[np.ndarray, np.ndarray], shape: tuple
+) -> np.ndarray:
+    """Blocks of DENSITY_BLOCK pixels which contain the board.
+
+    Wood grain or floor boards only have a single direction, the grid has both.
+    """
+    first, second = families
+    density = np.sqrt(
+        _density(segments[first], shape) * _density(segments[second], shape)
+    )
+    mask = (density > DENSITY_THRESHOLD * density.max()).astype(np.uint8)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, np.ones((3, 3), np.uint8))
+    _, components, stats, _ = cv2.connectedComponentsWithStats(mask)
+    largest = 1 + np.argmax(stats[1:, cv2.CC_STAT_AREA])
+    return cv2.dilate(
+        (components == largest).astype(np.uint8), np.ones((3, 3), np.uint8)
+    )
+
+
+def _inside(segments: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    blocks = ((segments[:, :2] + segments[:, 2:]) / 2 / DENSITY_BLOCK).astype(int)
+    return mask[blocks[:, 1], blocks[:, 0]] > 0
+
+
+def rectification(
+    segments: np.ndarray, mask: np.ndarray, shape: tuple
+) -> np.ndarray | None:
+    """Homography from the image to a canvas in which the grid lines are axis aligned.
+
+    Both vanishing points are moved to infinity and their directions are rotated
+    onto the axes. The canvas is scaled so the board mask fills most of it.
+    """
+    height, width = shape[:2]
+    half = max(height, width) / 2
+    # centered and scaled coordinates keep the homogeneous math well conditioned
+    normalize = np.array(
+        [[1 / half, 0, -width / 2 / half], [0, 1 / half, -height / 2 / half], [0, 0, 1]]
+    )
+    normalized = np.c_[
+        _apply(normalize, segments[:, :2]), _apply(normalize, segments[:, 2:])
+    ]
+
+    first, second = split_families(normalized)
+    if min(first.sum(), second.sum()) < MIN_SEGMENTS:
+        return None
+    rng = np.random.default_rng(0)
+    vertical, _ = vanishing_point(normalized[first], rng)
+    horizontal, _ = vanishing_point(normalized[second], rng)
+
+    horizon = np.cross(vertical, horizontal)
+    if abs(horizon[2]) < 1e-12:
+        return None
+    affine = np.array([[1, 0, 0], [0, 1, 0], horizon / horizon[2]])
+    directions = []
+    for point in (horizontal, vertical):
+        direction = (affine @ point)[:2]
+        directions.append(direction / np.linalg.norm(direction))
+    align = np.eye(3)
+    align[:2, :2] = np.linalg.inv(np.c_[directions[0], directions[1]])
+    matrix = align @ affine @ normalize
+
+    ys, xs = np.nonzero(mask)
+    corners = _apply(matrix, np.c_[xs, ys] * DENSITY_BLOCK + DENSITY_BLOCK / 2)
+    low, high = corners.min(axis=0), corners.max(axis=0)
+    scale = CANVAS_SIZE * 0.8 / (high - low)
+    offset = CANVAS_SIZE * 0.1 - low * scale
+    return (
+        np.array([[scale[0], 0, offset[0]], [0, scale[1], offset[1]], [0, 0, 1]])
+        @ matrix
+    )
+
+
+def _normalized(profile: np.ndarray) -> np.ndarray:
+    return profile / (profile.max() + 1e-9)
+
+
+def line_profiles(canvas: MatLike, mask: MatLike) -> tuple[np.ndarray, ...]:
+    """Column and row profiles of thin dark lines and long edges inside the board."""
+    vertical = cv2.morphologyEx(canvas, cv2.MORPH_BLACKHAT, np.ones((1, 7), np.uint8))
+    horizontal = cv2.morphologyEx(canvas, cv2.MORPH_BLACKHAT, np.ones((7, 1), np.uint8))
+    # a grid line continues along its direction, the outline of a stone does not
+    vertical = cv2.erode(vertical, np.ones((9, 1), np.uint8)).astype(np.float32) * mask
+    horizontal = (
+        cv2.erode(horizontal, np.ones((1, 9), np.uint8)).astype(np.float32) * mask
+    )
+
+    blurred = cv2.GaussianBlur(canvas.astype(np.float32), (0, 0), 1.5)
+    edges_x = np.abs(cv2.Sobel(blurred, cv2.CV_32F, 1, 0))
+    edges_y = np.abs(cv2.Sobel(blurred, cv2.CV_32F, 0, 1))
+    edges_x = cv2.erode(edges_x, np.ones((25, 1), np.uint8)) * mask
+    edges_y = cv2.erode(edges_y, np.ones((1, 25), np.uint8)) * mask
+
+    columns, rows = mask.sum(axis=0) + 1, mask.sum(axis=1) + 1
+    return (
+        _normalized(vertical.sum(axis=0) / columns),
+        _normalized(horizontal.sum(axis=1) / rows),
+        _normalized(edges_x.sum(axis=0) / columns),
+        _normalized(edges_y.sum(axis=1) / rows),
+    )
+
+
+def _sample(profile: np.ndarray, starts: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """(starts, offsets) values of the profile at every start plus every offset."""
+    return profile[(starts[:, None] + np.rint(offsets)[None]).astype(np.intp)]
+
+
+def fit_lattice(
+    lines: np.ndarray, edges: np.ndarray, min_spacing: float, max_spacing: float
+) -> tuple[float, float]:
+    """Position of the first line and spacing of GRID_SIZE equidistant lines.
+
+    Each line scores its response minus the response halfway to its neighbours,
+    which rules out half or double the spacing. The edges of the board just
+    outside of the outer lines decide between lattices shifted by a few lines.
+    """
+    # half pixel resolution
+    size = len(lines)
+    lines = np.interp(np.arange(2 * size) / 2, np.arange(size), lines)
+    edges = np.interp(np.arange(2 * size) / 2, np.arange(size), edges)
+    indexes = np.arange(GRID_SIZE)
+
+    best_score, best_start, best_spacing = -np.inf, 0.0, min_spacing
+    for spacing in np.arange(min_spacing, max_spacing, 0.25):
+        border = int(np.ceil(2 * spacing * EDGE_MARGINS[-1]))
+        starts = np.arange(border, int(2 * size - 36 * spacing - border - 1))
+        if len(starts) == 0:
+            break
+
+        positions = 2 * spacing * indexes
+        contrast = (
+            _sample(lines, starts, positions)
+            - (
+                _sample(lines, starts, positions - spacing)
+                + _sample(lines, starts, positions + spacing)
+            )
+            / 2
+        )
+        scores = np.sort(contrast, axis=1)[:, :WORST_LINES].mean(
+            axis=1
+        ) + contrast.mean(axis=1)
+        scores += EDGE_WEIGHT * (
+            _sample(edges, starts, -2 * spacing * EDGE_MARGINS).max(axis=1)
+            + _sample(edges, starts, 2 * spacing * (GRID_SIZE - 1 + EDGE_MARGINS)).max(
+                axis=1
+            )
+        )
+        best = int(np.argmax(scores))
+        if scores[best] > best_score:
+            best_score, best_start, best_spacing = (
+                scores[best],
+                starts[best] / 2,
+                spacing,
+            )
+    return best_start, best_spacing
+
+
+def order_corners(corners: np.ndarray) -> np.ndarray:
+    """Clockwise starting with the corner closest to the top left of the image."""
+    center = corners.mean(axis=0)
+    corners = corners[
+        np.argsort(np.arctan2(corners[:, 1] - center[1], corners[:, 0] - center[0]))
+    ]
+    return np.roll(corners, -int(np.argmin(corners.sum(axis=1))), axis=0)
+
+
+def coarse_corners(gray: MatLike) -> np.ndarray | None:
+    """Corners from the vanishing points of the grid lines and a fitted lattice."""
+    segments = line_segments(gray)
+    if len(segments) < 2 * MIN_SEGMENTS:
+        return None
+    mask = board_mask(segments, split_families(segments), gray.shape)
+    segments = segments[_inside(segments, mask)]
+    matrix = rectification(segments, mask, gray.shape)
+    if matrix is None:
+        return None
+
+    canvas = cv2.warpPerspective(gray, matrix, (CANVAS_SIZE, CANVAS_SIZE))
+    full_mask = cv2.resize(
+        mask, (gray.shape[1], gray.shape[0]), interpolation=cv2.INTER_NEAREST
+    )
+    canvas_mask = cv2.warpPerspective(full_mask, matrix, (CANVAS_SIZE, CANVAS_SIZE))
+    # the mask is only block accurate, the edges of the board may be just outside
+    canvas_mask = cv2.dilate(canvas_mask, np.ones((41, 41), np.uint8)).astype(
+        np.float32
+    )
+
+    lines_x, lines_y, edges_x, edges_y = line_profiles(canvas, canvas_mask)
+    spacing_range = (CANVAS_SIZE * 0.5 / GRID_SIZE, CANVAS_SIZE * 0.95 / GRID_SIZE)
+    x, spacing_x = fit_lattice(lines_x, edges_x, *spacing_range)
+    y, spacing_y = fit_lattice(lines_y, edges_y, *spacing_range)
+
+    # corners are half a cell outside of the outer grid lines, like convert_to_top_down
+    last = GRID_SIZE - 0.5
+    quad = np.array(
+        [
+            [x - spacing_x / 2, y - spacing_y / 2],
+            [x + last * spacing_x, y - spacing_y / 2],
+            [x + last * spacing_x, y + last * spacing_y],
+            [x - spacing_x / 2, y + last * spacing_y],
+        ]
+    )
+    return order_corners(_apply(np.linalg.inv(matrix), quad))
+
+
+def _top_down(gray: MatLike, corners: np.ndarray) -> tuple[np.ndarray, MatLike]:
+    target = np.float32(
+        [[0, 0], [TOP_DOWN_SIZE, 0], [TOP_DOWN_SIZE, TOP_DOWN_SIZE], [0, TOP_DOWN_SIZE]]
+    )
+    matrix = cv2.getPerspectiveTransform(np.float32(corners), target)
+    top_down = cv2.warpPerspective(gray, matrix, (TOP_DOWN_SIZE, TOP_DOWN_SIZE))
+    return matrix, _clahe(top_down)
+
+
+def _line_responses(top_down: MatLike) -> tuple[np.ndarray, np.ndarray]:
+    vertical = cv2.morphologyEx(top_down, cv2.MORPH_BLACKHAT, np.ones((1, 7), np.uint8))
+    horizontal = cv2.morphologyEx(
+        top_down, cv2.MORPH_BLACKHAT, np.ones((7, 1), np.uint8)
+    )
+    return (
+        cv2.erode(vertical, np.ones((7, 1), np.uint8)).astype(np.float32),
+        cv2.erode(horizontal, np.ones((1, 7), np.uint8)).astype(np.float32),
+    )
+
+
+def grid_alignment(gray: MatLike, corners: np.ndarray) -> float:
+    """Line response on the grid lines minus between them in the top down view."""
+    _, top_down = _top_down(gray, corners)
+    vertical, horizontal = _line_responses(top_down)
+    columns, rows = vertical.mean(axis=0), horizontal.mean(axis=1)
+    cell = TOP_DOWN_SIZE / GRID_SIZE
+    on = np.rint(cell / 2 + np.arange(GRID_SIZE) * cell).astype(int)
+    between = np.rint(np.arange(1, GRID_SIZE) * cell).astype(int)
+    return float(
+        columns[on].mean()
+        + rows[on].mean()
+        - columns[between].mean()
+        - rows[between].mean()
+    )
+
+
+def grid_score(image: MatLike, corners: list[list[float]]) -> float:
+    """Share of the grid lines whose response beats the points half a cell beside them.
+
+    Unlike grid_alignment it does not depend on the contrast of the photo, so a
+    single threshold (MIN_GRID_SCORE) tells whether detected corners can be used
+    without a check by hand.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    scale = min(1.0, REFINE_SIZE / max(gray.shape))
+    if scale < 1:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    _, top_down = _top_down(gray, np.asarray(corners) * scale)
+    vertical, horizontal = _line_responses(top_down)
+    cell = TOP_DOWN_SIZE / GRID_SIZE
+    on = np.rint(cell / 2 + np.arange(GRID_SIZE) * cell).astype(int)
+    before = np.clip(on - int(cell / 2), 0, TOP_DOWN_SIZE - 1)
+    after = np.clip(on + int(cell / 2), 0, TOP_DOWN_SIZE - 1)
+    standing_out = [
+        profile[on] > np.maximum(profile[before], profile[after])
+        for profile in (vertical.mean(axis=0), horizontal.mean(axis=1))
+    ]
+    return float(np.mean(standing_out))
+
+
+def _fit_grid_line(points: np.ndarray, expected: float) -> tuple[float, float]:
+    """position = offset + slope * (other - center), reweighted against outliers."""
+    if len(points) < MIN_LINE_POINTS:
+        return expected, 0.0
+    position, other, strength = points.T
+    design = np.c_[np.ones(len(points)), other - TOP_DOWN_SIZE / 2]
+    weights = strength
+    for _ in range(3):
+        coefficients = np.linalg.lstsq(
+            design * weights[:, None], position * weights, rcond=None
+        )[0]
+        residuals = np.abs(design @ coefficients - position)
+        weights = strength / (1 + (residuals / 1.5) ** 2)
+    return float(coefficients[0]), float(coefficients[1])
+
+
+def _grid_lines(response: np.ndarray) -> list[tuple[float, float]]:
+    """Sub-pixel line of every grid line crossing the columns of the response."""
+    cell = TOP_DOWN_SIZE / GRID_SIZE
+    radius = int(cell * REFINE_SEARCH)
+    lines = []
+    for line in range(GRID_SIZE):
+        expected = cell / 2 + line * cell
+        left = round(expected) - radius
+        points = []
+        # the strongest response between each pair of crossing lines
+        for band in range(GRID_SIZE):
+            start, end = int(band * cell), int((band + 1) * cell)
+            profile = response[start:end, left : left + 2 * radius + 1].sum(axis=0)
+            peak = int(np.argmax(profile))
+            if profile[peak] <= 0 or peak in (0, len(profile) - 1):
+                continue
+            before, at, after = profile[peak - 1 : peak + 2]
+            curvature = before - 2 * at + after
+            shift = 0.5 * (before - after) / curvature if curvature != 0 else 0.0
+            points.append((left + peak + shift, (start + end) / 2, at))
+        lines.append(_fit_grid_line(np.array(points).reshape(-1, 3), expected))
+    return lines
+
+
+def refine_corners(gray: MatLike, corners: np.ndarray) -> np.ndarray:
+    """Fits every grid line in the top down view and the homography to all intersections."""
+    cell = TOP_DOWN_SIZE / GRID_SIZE
+    center = TOP_DOWN_SIZE / 2
+    ideal = np.float32(
+        [
+            [cell / 2 + column * cell, cell / 2 + row * cell]
+            for column in range(GRID_SIZE)
+            for row in range(GRID_SIZE)
+        ]
+    )
+    target = np.float32(
+        [[0, 0], [TOP_DOWN_SIZE, 0], [TOP_DOWN_SIZE, TOP_DOWN_SIZE], [0, TOP_DOWN_SIZE]]
+    )
+    for _ in range(REFINE_ITERATIONS):
+        matrix, top_down = _top_down(gray, corners)
+        vertical, horizontal = _line_responses(top_down)
+        # x = a + b * (y - center) and y = c + d * (x - center)
+        columns = _grid_lines(vertical)
+        rows = _grid_lines(horizontal.T)
+
+        intersections = []
+        for a, b in columns:
+            for c, d in rows:
+                denominator = 1 - b * d
+                y = (
+                    (c + d * (a - b * center - center)) / denominator
+                    if abs(denominator) > 1e-6
+                    else c
+                )
+                intersections.append((a + b * (y - center), y))
+        found = cv2.perspectiveTransform(
+            np.float32(intersections)[None], np.linalg.inv(matrix)
+        )[0]
+        homography, _ = cv2.findHomography(ideal, found, cv2.RANSAC, 3.0)
+        if homography is None:
+            break
+        corners = cv2.perspectiveTransform(target[None], homography)[0]
+    return np.asarray(corners, dtype=np.float64)
+
+
+def detect_corners(image: MatLike) -> list[list[float]] | None:
+    """Pixel corners of the board in the order convert_to_top_down expects.
+
+    The first corner is the one closest to the top left of the image, the others
+    follow clockwise. Returns None if no grid was found.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape
+    scale = DETECTION_SIZE / max(height, width)
+    small = _clahe(
+        cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    )
+    corners = coarse_corners(small)
+    if corners is None:
+        return None
+    corners /= scale
+
+    refine_scale = min(1.0, REFINE_SIZE / max(height, width))
+    if refine_scale < 1:
+        gray = cv2.resize(
+            gray, None, fx=refine_scale, fy=refine_scale, interpolation=cv2.INTER_AREA
+        )
+    coarse = corners * refine_scale
+    refined = refine_corners(gray, coarse)
+    # a refinement which moves a corner by more than a cell found something else
+    cell = np.linalg.norm(coarse[0] - coarse[2]) / GRID_SIZE / np.sqrt(2)
+    if np.abs(refined - coarse).max() <= cell and grid_alignment(
+        gray, refined
+    ) > grid_alignment(gray, coarse):
+        corners = refined / refine_scale
+    return corners.tolist()
@@ -0,0 +1,46 @@
+import numpy as np
+
+from src import GRID_SIZE
+
+AMOUNT_POINTS = GRID_SIZE * GRID_SIZE
+# 2 bits per point, 4 points per byte
+POINTS_PER_BYTE = 4
+PACKED_SIZE = -(-AMOUNT_POINTS // POINTS_PER_BYTE)
+# value of each of the 4 points in a byte
+WEIGHTS = np.array([1, 4, 16, 64], dtype=np.uint8)
+# the 4 points of every possible byte
+UNPACKED_BYTES = (
+    (np.arange(256, dtype=np.uint8)[:, None] >> np.uint8([0, 2, 4, 6])) & 3
+).astype(np.int8)
+
+
+def pack_boards(boards: np.ndarray) -> np.ndarray:
+    """Packs boards of shape (n, AMOUNT_POINTS) or (n, GRID_SIZE, GRID_SIZE) into (n, PACKED_SIZE) uint8."""
+    values = np.asarray(boards, dtype=np.uint8).reshape(-1, AMOUNT_POINTS)
+    padded = np.zeros((len(values), PACKED_SIZE * POINTS_PER_BYTE), dtype=np.uint8)
+    padded[:, :AMOUNT_POINTS] = values
+    return padded.reshape(len(values), PACKED_SIZE, POINTS_PER_BYTE) @ WEIGHTS
+
+
+def unpack_boards(packed: np.ndarray) -> np.ndarray:
+    """Flat int8 Cell values of shape (n, AMOUNT_POINTS) of packed boards."""
+    packed = np.asarray(packed, dtype=np.uint8).reshape(-1, PACKED_SIZE)
+    return UNPACKED_BYTES[packed].reshape(len(packed), -1)[:, :AMOUNT_POINTS]
+
+
+def pack_board(board) -> bytes:
+    """Board as PACKED_SIZE (91) bytes, hashable and cheap to compare or send."""
+    return pack_boards(board).tobytes()
+
+
+def unpack_board(packed: bytes) -> np.ndarray:
+    """Flat int8 Cell values of a packed board."""
+    return unpack_boards(np.frombuffer(packed, dtype=np.uint8))[0]
+
+
+def packed_diff(first: bytes, second: bytes) -> np.ndarray:
+    """Flat indexes of the points which differ between two packed boards."""
+    changed = np.frombuffer(first, dtype=np.uint8) ^ np.frombuffer(
+        second, dtype=np.uint8
+    )
+    return np.flatnonzero(unpack_boards(changed)[0])
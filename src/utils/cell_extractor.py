@@ -0,0 +1,171 @@
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from src import CELL_SIZE, GRID_SIZE, HALF_CELL_SIZE, SCREEN_SIZE
+from src.utils.cv2_helper import BLUR_SHARPEN_MARGIN, blur_and_sharpen
+
+# every cell image covers the cell and half a cell on each side
+WINDOW_SIZE = CELL_SIZE + 2 * HALF_CELL_SIZE
+# the window is resized to CELL_SIZE for the classifier
+SCALE = WINDOW_SIZE // CELL_SIZE
+PADDED_SIZE = SCREEN_SIZE + 2 * HALF_CELL_SIZE
+AMOUNT_CELLS = GRID_SIZE * GRID_SIZE
+FEATURES = CELL_SIZE * CELL_SIZE * 3
+# cell images are reduced to SIGNATURE_SIZE x SIGNATURE_SIZE for change detection
+SIGNATURE_SIZE = 8
+
+
+def cell_windows(image: np.ndarray, cell_stride: int, size: int) -> np.ndarray:
+    """Read only (GRID_SIZE, GRID_SIZE, size, size, 3) view of overlapping windows."""
+    row_stride, column_stride, channel_stride = image.strides
+    return np.lib.stride_tricks.as_strided(
+        image,
+        shape=(GRID_SIZE, GRID_SIZE, size, size, 3),
+        strides=(
+            cell_stride * row_stride,
+            cell_stride * column_stride,
+            row_stride,
+            column_stride,
+            channel_stride,
+        ),
+        writeable=False,
+    )
+
+
+class CellExtractor:
+    """Extracts the classifier input of all cells of a top down image at once.
+
+    The top down image is copied into a buffer padded by repeating its edge
+    pixels, so the windows of the border cells have the same size as all others,
+    and downsampled as a whole. Repeating the edge is close to the clipped and
+    stretched border crops the classifiers were trained on, unlike black padding.
+    Each cell image is then a strided view into the downsampled buffer and the
+    batch is filled with a single copy into a preallocated array.
+
+    With preprocess the cell images are blurred and sharpened. Single cells are
+    filtered locally, only the whole board is filtered as one image.
+
+    The returned batch is overwritten by the next call.
+    """
+
+    def __init__(self, preprocess: bool = False):
+        self.preprocess = preprocess
+        self.padded = np.zeros((PADDED_SIZE, PADDED_SIZE, 3), dtype=np.uint8)
+        self.small = np.zeros(
+            (PADDED_SIZE // SCALE, PADDED_SIZE // SCALE, 3), dtype=np.uint8
+        )
+        self.batch = np.zeros((AMOUNT_CELLS, FEATURES), dtype=np.uint8)
+
+        self.windows = cell_windows(self.small, CELL_SIZE // SCALE, CELL_SIZE)
+        if preprocess:
+            self.filtered_small = np.zeros_like(self.small)
+            self.filtered_windows = cell_windows(
+                self.filtered_small, CELL_SIZE // SCALE, CELL_SIZE
+            )
+
+        signature_scale = CELL_SIZE // SIGNATURE_SIZE
+        self.signature_image = np.zeros(
+            (
+                self.small.shape[0] // signature_scale,
+                self.small.shape[1] // signature_scale,
+                3,
+            ),
+            dtype=np.uint8,
+        )
+        self.signature_windows = cell_windows(
+            self.signature_image,
+            CELL_SIZE // SCALE // signature_scale,
+            SIGNATURE_SIZE,
+        )
+
+    def load(self, frame: MatLike) -> None:
+        """Loads a SCREEN_SIZE x SCREEN_SIZE top down image."""
+        assert frame.shape == (SCREEN_SIZE, SCREEN_SIZE, 3), "Invalid frame shape"
+        cv2.copyMakeBorder(
+            frame,
+            HALF_CELL_SIZE,
+            HALF_CELL_SIZE,
+            HALF_CELL_SIZE,
+            HALF_CELL_SIZE,
+            cv2.BORDER_REPLICATE,
+            dst=self.padded,
+        )
+        cv2.resize(
+            self.padded,
+            self.small.shape[1::-1],
+            dst=self.small,
+            interpolation=cv2.INTER_LINEAR,
+        )
+
+    def downsampled(self) -> np.ndarray:
+        """Read only view of the loaded top down image at 1 / SCALE, without the padding."""
+        margin = HALF_CELL_SIZE // SCALE
+        return self.small[margin:-margin, margin:-margin]
+
+    def extract(self, indexes: np.ndarray | None = None) -> np.ndarray:
+        """Returns the flattened cell images in row major order (index = y * GRID_SIZE + x).
+
+        If indexes is given only those cells are extracted.
+        """
+        if indexes is None:
+            windows = self.windows
+            if self.preprocess:
+                cv2.resize(
+                    blur_and_sharpen(self.padded),
+                    self.filtered_small.shape[1::-1],
+                    dst=self.filtered_small,
+                    interpolation=cv2.INTER_LINEAR,
+                )
+                windows = self.filtered_windows
+            np.copyto(
+                self.batch.reshape(GRID_SIZE, GRID_SIZE, CELL_SIZE, CELL_SIZE, 3),
+                windows,
+            )
+            return self.batch
+
+        batch = self.batch[: len(indexes)]
+        cell_images = batch.reshape(-1, CELL_SIZE, CELL_SIZE, 3)
+        if self.preprocess:
+            for cell_image, index in zip(cell_images, indexes):
+                self._extract_preprocessed(index, cell_image)
+            return batch
+
+        ys, xs = np.divmod(indexes, GRID_SIZE)
+        cell_images[:] = self.windows[ys, xs]
+        return batch
+
+    def _extract_preprocessed(self, index: int, out: np.ndarray) -> None:
+        """Filters only the window of a single cell plus the margin the filter needs."""
+        y, x = divmod(int(index), GRID_SIZE)
+        # window of the cell in padded coordinates
+        top, left = y * CELL_SIZE, x * CELL_SIZE
+        y0 = max(0, top - BLUR_SHARPEN_MARGIN)
+        x0 = max(0, left - BLUR_SHARPEN_MARGIN)
+        y1 = min(PADDED_SIZE, top + WINDOW_SIZE + BLUR_SHARPEN_MARGIN)
+        x1 = min(PADDED_SIZE, left + WINDOW_SIZE + BLUR_SHARPEN_MARGIN)
+
+        patch = blur_and_sharpen(self.padded[y0:y1, x0:x1])
+        window = patch[
+            top - y0 : top - y0 + WINDOW_SIZE, left - x0 : left - x0 + WINDOW_SIZE
+        ]
+        out[:] = cv2.resize(
+            window, (CELL_SIZE, CELL_SIZE), interpolation=cv2.INTER_LINEAR
+        )
+
+    def signatures(self) -> np.ndarray:
+        """Returns a small area averaged thumbnail of every loaded cell image.
+
+        Shape is (AMOUNT_CELLS, SIGNATURE_SIZE * SIGNATURE_SIZE * 3) in row major order.
+        """
+        cv2.resize(
+            self.small,
+            self.signature_image.shape[1::-1],
+            dst=self.signature_image,
+            interpolation=cv2.INTER_AREA,
+        )
+        return self.signature_windows.reshape(AMOUNT_CELLS, -1).astype(np.int16)
+
+    def __call__(self, frame: MatLike) -> np.ndarray:
+        self.load(frame)
+        return self.extract()
@@ -0,0 +1,165 @@
+import importlib
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import numpy as np
+
+from src import CELL_SIZE, WEIGHTS_PATH
+from src.stone_classification import load_rf
+from src.utils.cell_extractor import AMOUNT_CELLS, FEATURES
+from src.utils.game import Cell
+
+WARMUP_RUNS = 3
+
+
+class ClassifierBackend(ABC):
+    """Classifies batches of flattened cell images (N, FEATURES) into Cell values.
+
+    Backends implement _predict_proba() which returns (N, len(Cell)) probabilities
+    with one column per Cell value. predict_proba() measures the latency of every
+    batch, predict() returns the most probable Cell values.
+    Heavy libraries are only imported by the backend which needs them.
+    """
+
+    name = "base"
+    default_path: Path
+    # modules imported by the backend, see import_dependencies()
+    dependencies: tuple[str, ...] = ()
+
+    def __init__(self):
+        self.batches: int = 0
+        self.cells: int = 0
+        self.seconds: float = 0.0
+        self.max_seconds: float = 0.0
+
+    @classmethod
+    def import_dependencies(cls) -> None:
+        """Imports the backend's libraries, e.g. to measure or front-load their import time."""
+        for module in cls.dependencies:
+            importlib.import_module(module)
+
+    @abstractmethod
+    def _predict_proba(self, batch: np.ndarray) -> np.ndarray: ...
+
+    def predict_proba(self, batch: np.ndarray) -> np.ndarray:
+        start = time.perf_counter()
+        probabilities = self._predict_proba(batch)
+        elapsed = time.perf_counter() - start
+
+        self.batches += 1
+        self.cells += len(batch)
+        self.seconds += elapsed
+        self.max_seconds = max(self.max_seconds, elapsed)
+        return probabilities
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return self.predict_proba(batch).argmax(axis=1).astype(np.int8)
+
+    def warmup(self, runs: int = WARMUP_RUNS) -> float:
+        """Classifies full boards until caches and allocations are settled.
+
+        Returns the latency of the last run in milliseconds. Warmup runs are not
+        part of stats().
+        """
+        batch = np.zeros((AMOUNT_CELLS, FEATURES), dtype=np.uint8)
+        elapsed = 0.0
+        for _ in range(runs):
+            start = time.perf_counter()
+            self._predict_proba(batch)
+            elapsed = time.perf_counter() - start
+        return elapsed * 1000
+
+    def stats(self) -> dict[str, float]:
+        batches = max(self.batches, 1)
+        return {
+            "batches": self.batches,
+            "cells": self.cells,
+            "mean_ms": round(self.seconds / batches * 1000, 2),
+            "max_ms": round(self.max_seconds * 1000, 2),
+        }
+
+
+class RandomForestBackend(ClassifierBackend):
+    """Pickled sklearn model or pipeline, see src/scripts/train_classifier.py."""
+
+    name = "rf"
+    default_path = WEIGHTS_PATH.joinpath("random_forest_model.pkl")
+    dependencies = ("sklearn.ensemble", "sklearn.pipeline")
+
+    def __init__(self, path: Path, threads: int | None = None):
+        super().__init__()
+        self.model = load_rf(path)
+        # pipelines from train_classifier.py end with the forest
+        estimator = self.model[-1] if hasattr(self.model, "steps") else self.model
+        if threads and "n_jobs" in estimator.get_params():
+            estimator.set_params(n_jobs=threads)
+        # column of each class the forest was trained with
+        self.columns = np.asarray(self.model.classes_, dtype=np.intp)
+
+    def _predict_proba(self, batch: np.ndarray) -> np.ndarray:
+        probabilities = np.zeros((len(batch), len(Cell)), dtype=np.float32)
+        probabilities[:, self.columns] = self.model.predict_proba(batch)
+        return probabilities
+
+
+class CnnBackend(ClassifierBackend):
+    """StoneClassifactionModel weights, trained in notebooks/0_classification.ipynb.
+
+    The whole batch runs through a single forward pass. The cell images are
+    already stored as (N, H, W, C), so permuting them gives a channels last
+    tensor without copying.
+    """
+
+    name = "cnn"
+    default_path = WEIGHTS_PATH.joinpath("classification_weights.pth")
+    dependencies = ("torch", "src.cnn_classification")
+
+    def __init__(
+        self, path: Path, threads: int | None = None, channels_last: bool = True
+    ):
+        import torch
+
+        from src.cnn_classification import load_cnn
+
+        super().__init__()
+        if threads:
+            torch.set_num_threads(threads)
+        self.channels_last = channels_last
+        self.model = load_cnn(path).eval()
+        if channels_last:
+            self.model = self.model.to(memory_format=torch.channels_last)
+
+    def _predict_proba(self, batch: np.ndarray) -> np.ndarray:
+        import torch
+
+        images = torch.from_numpy(np.ascontiguousarray(batch)).view(
+            -1, CELL_SIZE, CELL_SIZE, 3
+        )
+        images = images.permute(0, 3, 1, 2)
+        if not self.channels_last:
+            images = images.contiguous()
+
+        with torch.inference_mode():
+            # same normalization as during training: (x / 255 - 0.5) / 0.5
+            tensor = images.float().mul_(1 / 127.5).sub_(1)
+            probabilities = torch.softmax(self.model(tensor), dim=1)
+        return probabilities.numpy()
+
+
+CLASSIFIERS: dict[str, type[ClassifierBackend]] = {
+    RandomForestBackend.name: RandomForestBackend,
+    CnnBackend.name: CnnBackend,
+}
+
+
+def load_classifier(
+    name: str, path: Path | None = None, threads: int | None = None, **options
+) -> ClassifierBackend:
+    """Creates the backend registered as name, by default with its default weights.
+
+    options are passed to the backend, e.g. channels_last for the CNN.
+    """
+    assert name in CLASSIFIERS, f"Unknown classifier {name}"
+    backend = CLASSIFIERS[name]
+    return backend(path or backend.default_path, threads, **options)
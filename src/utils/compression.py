@@ -0,0 +1,62 @@
+import numpy as np
+from sklearn.tree._tree import Tree
+
+
+def prune_tree(tree: Tree, max_depth: int) -> Tree:
+    """Copy of tree where every node at max_depth becomes a leaf.
+
+    Inner nodes of sklearn trees keep the class distribution of their samples,
+    so they predict like a tree which was trained with max_depth.
+    """
+    state = tree.__getstate__()
+    nodes, values = state["nodes"], state["values"]
+
+    # breadth first, so children are always kept after their parents
+    keep, depths = [0], [0]
+    new_index = {0: 0}
+    position = 0
+    while position < len(keep):
+        node = nodes[keep[position]]
+        if node["left_child"] != -1 and depths[position] < max_depth:
+            for child in (int(node["left_child"]), int(node["right_child"])):
+                new_index[child] = len(keep)
+                keep.append(child)
+                depths.append(depths[position] + 1)
+        position += 1
+
+    pruned = nodes[keep].copy()
+    for position, depth in enumerate(depths):
+        if pruned[position]["left_child"] == -1 or depth >= max_depth:
+            pruned[position]["left_child"] = -1
+            pruned[position]["right_child"] = -1
+            pruned[position]["feature"] = -2
+            pruned[position]["threshold"] = -2
+        else:
+            for child in ("left_child", "right_child"):
+                pruned[position][child] = new_index[int(pruned[position][child])]
+
+    result = Tree(tree.n_features, np.array(tree.n_classes, dtype=np.intp), 1)
+    result.__setstate__(
+        {
+            "max_depth": max(depths),
+            "node_count": len(keep),
+            "nodes": pruned,
+            "values": np.ascontiguousarray(values[keep]),
+        }
+    )
+    return result
+
+
+def prune_forest(model, max_depth: int | None = None, n_estimators: int | None = None):
+    """Limits the depth and amount of trees of a random forest or rf pipeline in place.
+
+    The forest's own training data is not needed, the trees are cut after training.
+    """
+    forest = model[-1] if hasattr(model, "steps") else model
+    if n_estimators is not None:
+        forest.estimators_ = forest.estimators_[:n_estimators]
+        forest.n_estimators = len(forest.estimators_)
+    if max_depth is not None:
+        for estimator in forest.estimators_:
+            estimator.tree_ = prune_tree(estimator.tree_, max_depth)
+    return model
@@ -7,6 +7,9 @@ from cv2.typing import MatLike
 from src import CELL_SIZE, SCREEN_SIZE
 from src.utils.colors import Color
 
+# blur (5x5) and sharpen (3x3) read up to 3 pixels around each pixel
+BLUR_SHARPEN_MARGIN = 3
+
 
 def default_corners(shape: tuple[int, int, int]) -> list[list[int]]:
     """Corners should be a square in the middle of the image."""
@@ -34,13 +37,54 @@ def blur_and_sharpen(img: MatLike) -> MatLike:
     return cv2.filter2D(blurred_image, -1, kernel)
 
 
-def convert_to_top_down(frame: MatLike, corners: list) -> MatLike:
+def top_down_matrix(corners: list) -> np.ndarray:
+    """Homography from the camera image to the top down view of the board."""
     src_points = np.array(corners, dtype=np.float32).reshape(4, 2)
     dst_points = np.array(
         [[0, 0], [SCREEN_SIZE, 0], [SCREEN_SIZE, SCREEN_SIZE], [0, SCREEN_SIZE]],
         dtype=np.float32,
     )
+    return cv2.getPerspectiveTransform(src_points, dst_points)
+
 
-    matrix = cv2.getPerspectiveTransform(src_points, dst_points)
+def convert_to_top_down(frame: MatLike, corners: list) -> MatLike:
+    matrix = top_down_matrix(corners)
     new_shape = (SCREEN_SIZE, SCREEN_SIZE)
     return cv2.warpPerspective(frame, matrix, new_shape)
+
+
+class TopDownWarp:
+    """Top down warp for fixed corners.
+
+    The homography is turned into fixed-point remap tables once, every frame only
+    runs cv2.remap into the same preallocated output buffer. The returned image is
+    overwritten by the next call, copy it if it has to outlive the frame.
+    """
+
+    def __init__(self, corners: list):
+        self.corners = [list(corner) for corner in corners]
+
+        # warpPerspective samples the source at inverse(matrix) @ destination
+        inverse = np.linalg.inv(top_down_matrix(corners))
+        # a row and a column broadcast against each other, the warp is rebuilt
+        # whenever the board drifts (see DriftTracker)
+        pixels = np.arange(SCREEN_SIZE, dtype=np.float64)
+        xs, ys = pixels[None, :], pixels[:, None]
+        weights = inverse[2, 0] * xs + inverse[2, 1] * ys + inverse[2, 2]
+        map_x = (inverse[0, 0] * xs + inverse[0, 1] * ys + inverse[0, 2]) / weights
+        map_y = (inverse[1, 0] * xs + inverse[1, 1] * ys + inverse[1, 2]) / weights
+        map_x, map_y = map_x.astype(np.float32), map_y.astype(np.float32)
+
+        self.map_xy, self.map_interpolation = cv2.convertMaps(
+            map_x, map_y, cv2.CV_16SC2
+        )
+        self.output = np.zeros((SCREEN_SIZE, SCREEN_SIZE, 3), dtype=np.uint8)
+
+    def __call__(self, frame: MatLike) -> MatLike:
+        return cv2.remap(
+            frame,
+            self.map_xy,
+            self.map_interpolation,
+            cv2.INTER_LINEAR,
+            dst=self.output,
+        )
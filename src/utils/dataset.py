@@ -0,0 +1,70 @@
+import json
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from src import DATA_PATH, IMG_PATH, SGF_PATH
+from src.utils.cell_extractor import CellExtractor
+from src.utils.cv2_helper import convert_to_top_down
+from src.utils.game import Game
+
+LABELLED_CORNERS_PATH = DATA_PATH.joinpath("corners.json")
+
+
+@dataclass
+class LabelledImage:
+    path: Path
+    image: MatLike
+    corners: list[list[float]]  # pixel coordinates
+    labels: np.ndarray  # Cell values of the final board in row major order
+
+
+def labelled_images(
+    corners_path: Path = LABELLED_CORNERS_PATH,
+) -> Iterator[LabelledImage]:
+    """Photos of finished games in images/sgf with their hand labelled corners.
+
+    The labels are the final board of the matching sgf. Entries whose image is
+    not available are skipped.
+    """
+    with open(corners_path) as f:
+        data = json.load(f)
+
+    for game_id, images in data.items():
+        game = Game()
+        game.add_sgf(SGF_PATH.joinpath(f"{game_id}.sgf"))
+        labels = np.array(game.board, dtype=np.int8).flatten()
+
+        for filename, relative_corners in images.items():
+            path = IMG_PATH.joinpath("sgf", game_id, filename)
+            if not path.exists():
+                continue
+
+            image = cv2.imread(str(path))
+            corners = [
+                [corner[0] * image.shape[1], corner[1] * image.shape[0]]
+                for corner in relative_corners
+            ]
+            yield LabelledImage(path, image, corners, labels)
+
+
+def cell_dataset(
+    corners_path: Path = LABELLED_CORNERS_PATH,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Cell images, labels and image index of every cell of the labelled images.
+
+    Cell images are extracted like during a recording (warp, blur and sharpen,
+    CellExtractor), so models trained on them can be used by main.py directly.
+    """
+    extractor = CellExtractor(preprocess=True)
+    batches, labels, groups = [], [], []
+    for index, labelled in enumerate(labelled_images(corners_path)):
+        extractor.load(convert_to_top_down(labelled.image, labelled.corners))
+        batches.append(extractor.extract().copy())
+        labels.append(labelled.labels)
+        groups.append(np.full(len(labelled.labels), index))
+    return np.concatenate(batches), np.concatenate(labels), np.concatenate(groups)
@@ -0,0 +1,106 @@
+import numpy as np
+from cv2.typing import MatLike
+
+from src.utils.cell_extractor import AMOUNT_CELLS, CellExtractor
+from src.utils.game import Cell
+
+# max. difference of a single signature pixel until a cell counts as changed
+SIGNATURE_THRESHOLD = 24
+# every n-th frame all cells are classified again to prevent drifting labels
+FULL_REFRESH_INTERVAL = 30
+
+
+class DirtyCellTracker:
+    """Selects the cells whose image changed since they were classified last.
+
+    Every cell keeps the signature of the image it was classified with. A cell is
+    dirty if the signature of the current frame differs by more than the
+    threshold, all other cells reuse their cached probabilities and label.
+
+    prepare() returns the cell images which have to be classified and update()
+    takes their class probabilities, so batches of several boards can be
+    classified in a single call (see classify_boards).
+    """
+
+    def __init__(
+        self,
+        extractor: CellExtractor,
+        threshold: int = SIGNATURE_THRESHOLD,
+        refresh_interval: int = FULL_REFRESH_INTERVAL,
+    ):
+        self.extractor = extractor
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+
+        self.labels = np.zeros(AMOUNT_CELLS, dtype=np.int8)
+        self.probabilities = np.zeros((AMOUNT_CELLS, len(Cell)), dtype=np.float32)
+        self.signatures: np.ndarray | None = None
+        self.frames_since_refresh = 0
+
+        self.classified_cells: int = 0
+        self.reused_cells: int = 0
+
+        self._dirty: np.ndarray | None = None
+        self._pending_signatures: np.ndarray | None = None
+
+    def dirty_cells(self, signatures: np.ndarray) -> np.ndarray | None:
+        """Returns indexes of changed cells or None if all cells have to be classified."""
+        if (
+            self.signatures is None
+            or self.frames_since_refresh >= self.refresh_interval
+        ):
+            return None
+        difference = np.abs(signatures - self.signatures).max(axis=1)
+        return np.flatnonzero(difference > self.threshold)
+
+    def load(self, frame: MatLike) -> None:
+        """Loads the next top down frame, its downsampled copy is available before prepare()."""
+        self.extractor.load(frame)
+
+    def prepare(self) -> np.ndarray:
+        """Returns the cell images of the loaded frame which have to be classified."""
+        self._pending_signatures = self.extractor.signatures()
+        self._dirty = self.dirty_cells(self._pending_signatures)
+        return self.extractor.extract(self._dirty)
+
+    def update(self, probabilities: np.ndarray) -> np.ndarray:
+        """Applies the probabilities of the prepared cells and returns all labels in row major order."""
+        assert self._pending_signatures is not None, "prepare() must be called first"
+        signatures, dirty = self._pending_signatures, self._dirty
+        self._pending_signatures = None
+
+        if dirty is None:
+            self.probabilities[:] = probabilities
+            self.labels[:] = probabilities.argmax(axis=1)
+            self.signatures = signatures
+            self.frames_since_refresh = 0
+            self.classified_cells += AMOUNT_CELLS
+            return self.labels
+
+        self.frames_since_refresh += 1
+        self.reused_cells += AMOUNT_CELLS - len(dirty)
+        if len(dirty) == 0:
+            return self.labels
+
+        assert self.signatures is not None
+        self.probabilities[dirty] = probabilities
+        self.labels[dirty] = probabilities.argmax(axis=1)
+        self.signatures[dirty] = signatures[dirty]
+        self.classified_cells += len(dirty)
+        return self.labels
+
+    def stats(self) -> dict[str, int]:
+        return {"classified": self.classified_cells, "reused": self.reused_cells}
+
+
+def classify_boards(model, trackers: list[DirtyCellTracker]) -> list[np.ndarray]:
+    """Classifies the dirty cells of the loaded frames of all boards with a single predict_proba call."""
+    batches = [tracker.prepare() for tracker in trackers]
+    sizes = [len(batch) for batch in batches]
+
+    probabilities = np.zeros((0, len(Cell)), dtype=np.float32)
+    if sum(sizes) > 0:
+        probabilities = model.predict_proba(np.concatenate(batches))
+
+    splits = np.split(probabilities, np.cumsum(sizes)[:-1])
+    return [tracker.update(split) for tracker, split in zip(trackers, splits)]
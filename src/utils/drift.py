@@ -0,0 +1,216 @@
+import time
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from src import CELL_SIZE, GRID_SIZE, SCREEN_SIZE
+from src.utils.cv2_helper import top_down_matrix
+
+# frames between two checks of the board position
+DRIFT_INTERVAL = 5
+# corner movement in cells until the warp is rebuilt
+DRIFT_THRESHOLD = 0.15
+# cells around each corner, in the top down view, in which features are tracked.
+# The area reaches past the corner to include the edge of the board
+CORNER_AREA_CELLS = 3
+CORNER_OUTSIDE_CELLS = 1
+FEATURES_PER_CORNER = 16
+MIN_CORNERS_TRACKED = 3
+MIN_FEATURES_PER_CORNER = 4
+# max. distance in pixels of a tracked feature to the fitted homography
+RANSAC_THRESHOLD = 2.0
+FLOW_WINDOW = (21, 21)
+FLOW_LEVELS = 3
+# pixels around the features of a corner which are cropped for the optical flow
+FLOW_MARGIN = 48
+
+
+class DriftTracker:
+    """Re-estimates the corners while the board moves during a recording.
+
+    Features near the four corners of the first frame are tracked with sparse
+    optical flow into every n-th frame, always from the first frame so errors do
+    not add up. A homography fitted to the tracked features (RANSAC, hands and
+    new stones are outliers) moves the corners. New corners are only returned
+    once a corner moved further than the threshold, so the warp is not rebuilt
+    for noise.
+    """
+
+    def __init__(
+        self,
+        frame: MatLike,
+        corners: list,
+        interval: int = DRIFT_INTERVAL,
+        threshold: float = DRIFT_THRESHOLD,
+    ):
+        assert interval > 0, "interval must be positive"
+        self.interval = interval
+        self.threshold = threshold
+
+        self.reference_corners = np.array(corners, dtype=np.float32).reshape(4, 2)
+        self.corners = self.reference_corners.copy()
+        self.homography = np.eye(3)
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        self.points, self.point_corners = self.corner_features(gray)
+        # only the surroundings of the features are compared, not the whole frame
+        self.boxes: dict[int, tuple[int, int, int, int]] = {}
+        self.crops: dict[int, MatLike] = {}
+        for index in np.unique(self.point_corners):
+            points = self.points[self.point_corners == index]
+            left, top = np.maximum(points.min(axis=0) - FLOW_MARGIN, 0).astype(int)
+            right, bottom = (points.max(axis=0) + FLOW_MARGIN).astype(int)
+            right, bottom = min(right, gray.shape[1]), min(bottom, gray.shape[0])
+            self.boxes[index] = (left, top, right, bottom)
+            self.crops[index] = gray[top:bottom, left:right].copy()
+
+        self.frame: int = 0
+        self.checks: int = 0
+        self.corrections: int = 0
+        self.skipped: int = 0
+        self.total_ms: float = 0.0
+        self.max_ms: float = 0.0
+
+    def corner_features(self, gray: MatLike) -> tuple[np.ndarray, np.ndarray]:
+        """Good features to track near each corner and the index of their corner."""
+        inverse = np.linalg.inv(top_down_matrix(self.reference_corners.tolist()))
+        inside, outside = (
+            CORNER_AREA_CELLS * CELL_SIZE,
+            -CORNER_OUTSIDE_CELLS * CELL_SIZE,
+        )
+        points, point_corners = [], []
+        for index, (x, y) in enumerate(
+            [(0, 0), (SCREEN_SIZE, 0), (SCREEN_SIZE, SCREEN_SIZE), (0, SCREEN_SIZE)]
+        ):
+            # square from outside the corner towards the center of the board
+            sign_x, sign_y = (1 if x == 0 else -1), (1 if y == 0 else -1)
+            square = np.float32(
+                [
+                    [x + sign_x * outside, y + sign_y * outside],
+                    [x + sign_x * inside, y + sign_y * outside],
+                    [x + sign_x * inside, y + sign_y * inside],
+                    [x + sign_x * outside, y + sign_y * inside],
+                ]
+            )
+            polygon = cv2.perspectiveTransform(square[None], inverse)[0]
+            mask = np.zeros_like(gray)
+            cv2.fillConvexPoly(mask, np.round(polygon).astype(np.int32), 255)
+            found = cv2.goodFeaturesToTrack(
+                gray, FEATURES_PER_CORNER, 0.01, 5, mask=mask
+            )
+            if found is None:
+                continue
+            points.append(found.reshape(-1, 2))
+            point_corners.append(np.full(len(found), index))
+        if not points:
+            return np.zeros((0, 2), np.float32), np.zeros(0, np.int64)
+        return np.concatenate(points), np.concatenate(point_corners)
+
+    def update(self, frame: MatLike) -> list[list[int]] | None:
+        """Returns the new corners if the board moved further than the threshold."""
+        self.frame += 1
+        if self.frame % self.interval or len(self.points) == 0:
+            return None
+
+        start = time.perf_counter()
+        try:
+            return self.check(frame)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            self.checks += 1
+            self.total_ms += duration
+            self.max_ms = max(self.max_ms, duration)
+
+    def track_corner(
+        self, frame: MatLike, index: int, predicted: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Tracked positions of the features of a corner and which were found."""
+        mask = self.point_corners == index
+        left, top, right, bottom = self.boxes[index]
+        # the crop of the frame follows the predicted movement of the corner
+        shift_x, shift_y = np.round(
+            (predicted[mask] - self.points[mask]).mean(axis=0)
+        ).astype(int)
+        height, width = frame.shape[:2]
+        if (
+            left + shift_x < 0
+            or top + shift_y < 0
+            or right + shift_x > width
+            or bottom + shift_y > height
+        ):
+            return predicted[mask], np.zeros(mask.sum(), dtype=bool)
+
+        crop = cv2.cvtColor(
+            frame[top + shift_y : bottom + shift_y, left + shift_x : right + shift_x],
+            cv2.COLOR_BGR2GRAY,
+        )
+        origin = np.float32([left, top])
+        tracked, status, _ = cv2.calcOpticalFlowPyrLK(
+            self.crops[index],
+            crop,
+            self.points[mask] - origin,
+            predicted[mask] - origin - np.float32([shift_x, shift_y]),
+            winSize=FLOW_WINDOW,
+            maxLevel=FLOW_LEVELS,
+            flags=cv2.OPTFLOW_USE_INITIAL_FLOW,
+        )
+        return tracked + origin + np.float32([shift_x, shift_y]), status.ravel() == 1
+
+    def check(self, frame: MatLike) -> list[list[int]] | None:
+        # the last estimate is the starting point, so only the new movement is searched
+        predicted = cv2.perspectiveTransform(self.points[None], self.homography)[0]
+        tracked = predicted.copy()
+        found = np.zeros(len(self.points), dtype=bool)
+        for index in self.boxes:
+            mask = self.point_corners == index
+            tracked[mask], found[mask] = self.track_corner(frame, index, predicted)
+        if not self.enough_corners(found):
+            self.skipped += 1
+            return None
+
+        homography, inliers = cv2.findHomography(
+            self.points[found], tracked[found], cv2.RANSAC, RANSAC_THRESHOLD
+        )
+        if homography is None:
+            self.skipped += 1
+            return None
+        found[found] = inliers.ravel() == 1
+        if not self.enough_corners(found):
+            # e.g. hands cover most corners and the homography only fits one of them
+            self.skipped += 1
+            return None
+
+        self.homography = homography
+        corners = cv2.perspectiveTransform(self.reference_corners[None], homography)[0]
+        drift = float(np.linalg.norm(corners - self.corners, axis=1).max())
+        if drift < self.threshold * self.cell_size():
+            return None
+
+        self.corners = corners
+        self.corrections += 1
+        return np.round(corners).astype(int).tolist()
+
+    def enough_corners(self, tracked: np.ndarray) -> bool:
+        counts = np.bincount(self.point_corners[tracked], minlength=4)
+        return (counts >= MIN_FEATURES_PER_CORNER).sum() >= MIN_CORNERS_TRACKED
+
+    def cell_size(self) -> float:
+        sides = np.linalg.norm(self.corners - np.roll(self.corners, 1, axis=0), axis=1)
+        return float(sides.mean() / GRID_SIZE)
+
+    def drift(self) -> float:
+        """Distance in pixels of the furthest corner from its position at the start."""
+        return float(
+            np.linalg.norm(self.corners - self.reference_corners, axis=1).max()
+        )
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "checks": self.checks,
+            "corrections": self.corrections,
+            "skipped": self.skipped,
+            "drift_px": round(self.drift(), 1),
+            "mean_ms": round(self.total_ms / self.checks, 2) if self.checks else 0.0,
+            "max_ms": round(self.max_ms, 2),
+        }
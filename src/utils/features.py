@@ -0,0 +1,109 @@
+from collections.abc import Callable
+from itertools import pairwise
+
+import cv2
+import numpy as np
+
+from src import CELL_SIZE
+
+# stones cover the center of a cell image, the outer half shows the neighbors
+CENTER_START = CELL_SIZE // 4
+CENTER_END = CELL_SIZE - CELL_SIZE // 4
+
+CENTER_FEATURE_SIZE = 8
+HISTOGRAM_SIZE = 16
+HISTOGRAM_BINS = 16
+RING_SIZE = 16
+# in pixels of the CELL_SIZE cell image
+RING_RADII = [0, 4, 8, 12, 16, 24]
+
+
+def cell_images(batch: np.ndarray) -> np.ndarray:
+    """(N, CELL_SIZE * CELL_SIZE * 3) flattened batch to (N, CELL_SIZE, CELL_SIZE, 3)."""
+    return np.asarray(batch).reshape(-1, CELL_SIZE, CELL_SIZE, 3)
+
+
+def downsample(images: np.ndarray, size: int) -> np.ndarray:
+    """Area averages (N, H, W, 3) images to (N, size, size, 3).
+
+    All images are stacked into one tall image, so a single cv2.resize is enough.
+    """
+    amount, height = images.shape[:2]
+    tall = np.ascontiguousarray(images).reshape(amount * height, -1, 3)
+    small = cv2.resize(tall, (size, amount * size), interpolation=cv2.INTER_AREA)
+    return small.reshape(amount, size, size, 3)
+
+
+def center(batch: np.ndarray) -> np.ndarray:
+    return cell_images(batch)[:, CENTER_START:CENTER_END, CENTER_START:CENTER_END]
+
+
+def raw_features(batch: np.ndarray) -> np.ndarray:
+    """The flattened cell image itself (12288 features)."""
+    return np.asarray(batch)
+
+
+def center_features(batch: np.ndarray) -> np.ndarray:
+    """Center of the cell image, area averaged to 8x8 (192 features)."""
+    small = downsample(center(batch), CENTER_FEATURE_SIZE)
+    return small.reshape(len(small), -1).astype(np.float32)
+
+
+def histogram_features(batch: np.ndarray) -> np.ndarray:
+    """Per channel histograms of the center plus mean and std of its brightness (50 features)."""
+    pixels = downsample(center(batch), HISTOGRAM_SIZE).reshape(-1, HISTOGRAM_SIZE**2, 3)
+    amount = len(pixels)
+
+    # a single bincount over (image, channel, bin) instead of one histogram per image
+    bins = (pixels // (256 // HISTOGRAM_BINS)).astype(np.int32)
+    bins += (np.arange(amount, dtype=np.int32)[:, None, None] * 3 + np.arange(3)) * (
+        HISTOGRAM_BINS
+    )
+    histograms = np.bincount(
+        bins.ravel(), minlength=amount * 3 * HISTOGRAM_BINS
+    ).reshape(amount, 3 * HISTOGRAM_BINS)
+
+    brightness = pixels.mean(axis=2, dtype=np.float32)
+    return np.hstack(
+        [
+            histograms / pixels.shape[1],
+            brightness.mean(axis=1, keepdims=True) / 255,
+            brightness.std(axis=1, keepdims=True) / 255,
+        ]
+    ).astype(np.float32)
+
+
+def _ring_weights() -> np.ndarray:
+    scale = CELL_SIZE / RING_SIZE
+    ys, xs = (np.indices((RING_SIZE, RING_SIZE)) - (RING_SIZE - 1) / 2) * scale
+    distances = np.hypot(ys, xs).ravel()
+    rings = [
+        (inner <= distances) & (distances < outer)
+        for inner, outer in pairwise(RING_RADII)
+    ]
+    weights = np.array(rings, dtype=np.float32)
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+RING_WEIGHTS = _ring_weights()
+
+
+def ring_features(batch: np.ndarray) -> np.ndarray:
+    """Mean and std of each channel in rings around the intersection (30 features)."""
+    small = downsample(cell_images(batch), RING_SIZE)
+    amount = len(small)
+    # (N * 3, pixels) so the weighted sums are a single matrix multiplication
+    pixels = small.reshape(amount, -1, 3).transpose(0, 2, 1).astype(np.float32)
+    pixels = pixels.reshape(amount * 3, -1)
+    means = pixels @ RING_WEIGHTS.T
+    squares = (pixels * pixels) @ RING_WEIGHTS.T
+    stds = np.sqrt(np.maximum(squares - means * means, 0))
+    return np.hstack([means.reshape(amount, -1), stds.reshape(amount, -1)])
+
+
+FEATURE_EXTRACTORS: dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "raw": raw_features,
+    "center": center_features,
+    "histogram": histogram_features,
+    "ring": ring_features,
+}
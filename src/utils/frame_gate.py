@@ -0,0 +1,132 @@
+import time
+from collections import Counter
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from src import SCREEN_SIZE
+
+# side of the copy of the warped frame occlusion and exposure are scored on
+GATE_SIZE = SCREEN_SIZE // 8
+# side of the copy blur is scored on, small copies hide blur. GATE_SIZE is
+# downsampled from it, so the frame is only resized once
+BLUR_SIZE = SCREEN_SIZE // 4
+# a pixel moved if its brightness changed by more than this since the last frame
+MOTION_PIXEL_THRESHOLD = 30
+# share of moved pixels which counts as occlusion. A single stone is ~0.3%
+MOTION_AREA = 0.02
+# share of skin coloured pixels above the board's own share (wood is often skin coloured)
+SKIN_AREA = 0.02
+SKIN_LOWER = np.array([0, 133, 77], dtype=np.uint8)  # YCrCb
+SKIN_UPPER = np.array([255, 173, 127], dtype=np.uint8)
+# variance of the laplacian compared to the sharpest accepted frames
+BLUR_RATIO = 0.5
+# mean brightness and share of clipped pixels of a well exposed frame
+EXPOSURE_RANGE = (40, 215)
+CLIPPED_AREA = 0.25
+# weight of a new accepted frame in the references of skin share and sharpness
+REFERENCE_ALPHA = 0.05
+# after this many rejected frames in a row one frame is let through, so a wrong
+# reference can not stop the recording
+MAX_REJECTED_FRAMES = 150
+GATE_REASONS = ("motion", "skin", "blur", "exposure")
+
+
+class FrameGate:
+    """Drops frames before the cells are classified.
+
+    A hand over the board (motion since the last frame or more skin coloured
+    pixels than usual), motion blur and bad exposure are scored on small copies
+    of the warped frame. Skin share and sharpness depend on the board, so they
+    are compared with a moving reference of the accepted frames.
+    """
+
+    def __init__(self, reasons: tuple[str, ...] = GATE_REASONS):
+        assert set(reasons) <= set(GATE_REASONS), f"Unknown reasons: {reasons}"
+        self.reasons = reasons
+        self.previous: np.ndarray | None = None
+        self.skin_reference: float | None = None
+        self.sharpness_reference: float | None = None
+        self.rejected_in_row: int = 0
+
+        self.counts: Counter[str] = Counter()
+        self.total_ms: float = 0.0
+
+    def accept(self, frame: MatLike) -> bool:
+        """False if the warped frame should not be classified.
+
+        The frame can be a downsampled copy, e.g. CellExtractor.downsampled(), as
+        long as it is at least BLUR_SIZE wide.
+        """
+        start = time.perf_counter()
+        reason = self.reject_reason(frame)
+        self.total_ms += (time.perf_counter() - start) * 1000
+
+        if reason and self.rejected_in_row < MAX_REJECTED_FRAMES:
+            self.rejected_in_row += 1
+            self.counts[reason] += 1
+            return False
+        self.rejected_in_row = 0
+        self.counts["accepted"] += 1
+        return True
+
+    def reject_reason(self, frame: MatLike) -> str | None:
+        medium = cv2.resize(frame, (BLUR_SIZE, BLUR_SIZE), interpolation=cv2.INTER_AREA)
+        small = cv2.resize(medium, (GATE_SIZE, GATE_SIZE), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        previous, self.previous = self.previous, gray
+
+        if "exposure" in self.reasons:
+            clipped = np.count_nonzero((gray < 5) | (gray > 250)) / gray.size
+            if (
+                not EXPOSURE_RANGE[0] <= gray.mean() <= EXPOSURE_RANGE[1]
+                or clipped > CLIPPED_AREA
+            ):
+                return "exposure"
+
+        if "motion" in self.reasons and previous is not None:
+            moved = cv2.absdiff(gray, previous) > MOTION_PIXEL_THRESHOLD
+            if np.count_nonzero(moved) / moved.size > MOTION_AREA:
+                return "motion"
+
+        skin = None
+        if "skin" in self.reasons:
+            ycrcb = cv2.cvtColor(small, cv2.COLOR_BGR2YCrCb)
+            mask = cv2.inRange(ycrcb, SKIN_LOWER, SKIN_UPPER)
+            skin = np.count_nonzero(mask) / mask.size
+            if (
+                self.skin_reference is not None
+                and skin > self.skin_reference + SKIN_AREA
+            ):
+                return "skin"
+
+        sharpness = None
+        if "blur" in self.reasons:
+            blur_gray = cv2.cvtColor(medium, cv2.COLOR_BGR2GRAY)
+            sharpness = float(cv2.Laplacian(blur_gray, cv2.CV_32F).var())
+            if (
+                self.sharpness_reference is not None
+                and sharpness < BLUR_RATIO * self.sharpness_reference
+            ):
+                return "blur"
+
+        self.skin_reference = _moving_average(self.skin_reference, skin)
+        self.sharpness_reference = _moving_average(self.sharpness_reference, sharpness)
+        return None
+
+    def stats(self) -> dict[str, float]:
+        frames = sum(self.counts.values())
+        return {
+            "accepted": self.counts["accepted"],
+            **{reason: self.counts[reason] for reason in self.reasons},
+            "mean_ms": round(self.total_ms / frames, 2) if frames else 0.0,
+        }
+
+
+def _moving_average(reference: float | None, value: float | None) -> float | None:
+    if value is None:
+        return reference
+    if reference is None:
+        return value
+    return reference + REFERENCE_ALPHA * (value - reference)
@@ -0,0 +1,276 @@
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+import cv2
+from cv2.typing import MatLike
+
+from src.utils.custom_logger import get_color_logger
+
+logger = get_color_logger()
+
+FRAME_BUFFER_SIZE = 2
+RECONNECT_DELAY = 2.0
+FAILED_READS_BEFORE_REOPEN = 3
+DECODE_AHEAD = 8
+IMAGE_SEQUENCE_FPS = 30.0
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
+
+
+@dataclass
+class Frame:
+    image: MatLike
+    timestamp: float  # time.monotonic() directly after the capture
+    index: int
+
+
+class FrameGrabber:
+    """Reads camera frames on a background thread and keeps only the newest ones.
+
+    Consumers always get the freshest frame. Frames that were captured but never
+    handed out are counted as dropped instead of piling up in the driver buffer.
+    """
+
+    def __init__(self, source: int, buffer_size: int = FRAME_BUFFER_SIZE):
+        assert buffer_size > 0, "buffer_size must be positive"
+        self.source = source
+        self.cap: cv2.VideoCapture | None = None
+        self.frames: deque[Frame] = deque(maxlen=buffer_size)
+
+        self.captured: int = 0
+        self.dropped: int = 0
+        self.failed_reads: int = 0
+        self.reconnects: int = 0
+
+        self._last_index: int = -1
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def open(self) -> bool:
+        self.cap = cv2.VideoCapture(self.source)
+        # only the newest frame matters, every buffered frame is stale
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return self.cap.isOpened()
+
+    def start(self) -> "FrameGrabber":
+        assert self.cap is not None, "open() must be called before start()"
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join()
+        if self.cap:
+            self.cap.release()
+
+    def peek(self, timeout: float | None = None) -> Frame | None:
+        """Returns the newest frame without marking it as read."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.frames, timeout)
+            return self.frames[-1] if self.frames else None
+
+    def read(self, timeout: float | None = None) -> Frame | None:
+        """Returns the newest frame which was not returned before.
+
+        Blocks until such a frame exists. Returns None on timeout or after stop().
+        """
+        with self._condition:
+            has_new_frame = self._condition.wait_for(
+                lambda: (
+                    self._stopped.is_set()
+                    or (self.frames and self.frames[-1].index > self._last_index)
+                ),
+                timeout,
+            )
+            if not has_new_frame or self._stopped.is_set():
+                return None
+
+            frame = self.frames[-1]
+            self.dropped += frame.index - self._last_index - 1
+            self._last_index = frame.index
+            return frame
+
+    @property
+    def exhausted(self) -> bool:
+        """A camera never runs out of frames."""
+        return False
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "failed_reads": self.failed_reads,
+            "reconnects": self.reconnects,
+        }
+
+    def _run(self) -> None:
+        consecutive_failures = 0
+        while not self._stopped.is_set():
+            assert self.cap is not None
+            ret, image = self.cap.read()
+            timestamp = time.monotonic()
+
+            # Handling connecting issues with Iphone
+            if not ret:
+                self.failed_reads += 1
+                consecutive_failures += 1
+                self._stopped.wait(RECONNECT_DELAY)
+                if consecutive_failures >= FAILED_READS_BEFORE_REOPEN:
+                    self._reopen()
+                    consecutive_failures = 0
+                continue
+            consecutive_failures = 0
+
+            with self._condition:
+                self.frames.append(Frame(image, timestamp, self.captured))
+                self.captured += 1
+                self._condition.notify_all()
+
+    def _reopen(self) -> None:
+        logger.warning(f"Camera {self.source} is not responding. Reconnecting ...")
+        assert self.cap is not None
+        self.cap.release()
+        self.open()
+        self.reconnects += 1
+
+
+class FileFrameSource:
+    """Decodes a video file or a directory of images ahead on a background thread.
+
+    Unlike the FrameGrabber no frame is dropped, decoding waits for the consumer
+    instead, so frames are processed as fast as the consumer allows. Timestamps
+    are taken from the video (or IMAGE_SEQUENCE_FPS for images) and with
+    frame_step only frames at least frame_step seconds apart are kept.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        frame_step: float = 0.0,
+        buffer_size: int = DECODE_AHEAD,
+    ):
+        self.path = path
+        self.frame_step = frame_step
+        self.frames: deque[Frame] = deque()
+        self.buffer_size = buffer_size
+        self.finished = False
+
+        self.decoded: int = 0
+        self.skipped: int = 0
+
+        self._next_timestamp = 0.0
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def open(self) -> bool:
+        if self.path.is_dir():
+            return any(self._image_paths())
+        cap = cv2.VideoCapture(str(self.path))
+        is_opened = cap.isOpened()
+        cap.release()
+        return is_opened
+
+    def start(self) -> "FileFrameSource":
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join()
+
+    def peek(self, timeout: float | None = None) -> Frame | None:
+        """Returns the next frame without consuming it."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.frames or self.finished, timeout)
+            return self.frames[0] if self.frames else None
+
+    def read(self, timeout: float | None = None) -> Frame | None:
+        """Returns the next frame. None on timeout or when all frames are read."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.frames or self.finished, timeout)
+            if not self.frames:
+                return None
+            frame = self.frames.popleft()
+            self._condition.notify_all()
+            return frame
+
+    @property
+    def exhausted(self) -> bool:
+        with self._condition:
+            return self.finished and not self.frames
+
+    def stats(self) -> dict[str, int]:
+        return {"decoded": self.decoded, "skipped": self.skipped}
+
+    def _run(self) -> None:
+        frames = self._image_frames() if self.path.is_dir() else self._video_frames()
+        for frame in frames:
+            if self._stopped.is_set():
+                break
+
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: (
+                        len(self.frames) < self.buffer_size or self._stopped.is_set()
+                    )
+                )
+                self.frames.append(frame)
+                self.decoded += 1
+                self._condition.notify_all()
+
+        with self._condition:
+            self.finished = True
+            self._condition.notify_all()
+
+    def _keep(self, timestamp: float) -> bool:
+        if timestamp < self._next_timestamp:
+            self.skipped += 1
+            return False
+        self._next_timestamp = timestamp + self.frame_step
+        return True
+
+    def _video_frames(self) -> Iterator[Frame]:
+        cap = cv2.VideoCapture(str(self.path))
+        index = -1
+        # grab() only reads the frame, the expensive retrieve() is skipped for
+        # frames which are dropped by frame_step
+        while cap.grab():
+            index += 1
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            if not self._keep(timestamp):
+                continue
+            ret, image = cap.retrieve()
+            if ret:
+                yield Frame(image, timestamp, index)
+        cap.release()
+
+    def _image_frames(self) -> Iterator[Frame]:
+        for index, path in enumerate(self._image_paths()):
+            if not self._keep(index / IMAGE_SEQUENCE_FPS):
+                continue
+            image = cv2.imread(str(path))
+            if image is None:
+                logger.warning(f"Skipping unreadable image: {path}")
+                continue
+            yield Frame(image, index / IMAGE_SEQUENCE_FPS, index)
+
+    def _image_paths(self) -> list[Path]:
+        return sorted(
+            path
+            for path in self.path.iterdir()
+            if path.suffix.lower() in IMAGE_SUFFIXES
+        )
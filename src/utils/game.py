@@ -1,10 +1,14 @@
-from copy import deepcopy
+from dataclasses import dataclass, field
 from enum import IntEnum, auto
+from functools import cache
 from pathlib import Path
 
+import cv2
+import numpy as np
 from sgfmill import sgf
 
 from src import GRID_SIZE
+from src.utils.board_encoding import AMOUNT_POINTS, pack_board, unpack_board
 
 
 class Cell(IntEnum):
@@ -16,85 +20,431 @@ class Cell(IntEnum):
         return {"EMPTY": "e", "BLACK": "b", "WHITE": "w"}[self.name]
 
 
+def _neighbor_indexes() -> list[tuple[int, ...]]:
+    """Flat indexes of the neighbors of each flat index (y * GRID_SIZE + x)."""
+    lookup = []
+    for index in range(AMOUNT_POINTS):
+        y, x = divmod(index, GRID_SIZE)
+        neighbors = []
+        if x > 0:
+            neighbors.append(index - 1)
+        if x < GRID_SIZE - 1:
+            neighbors.append(index + 1)
+        if y > 0:
+            neighbors.append(index - GRID_SIZE)
+        if y < GRID_SIZE - 1:
+            neighbors.append(index + GRID_SIZE)
+        lookup.append(tuple(neighbors))
+    return lookup
+
+
+NEIGHBORS = _neighbor_indexes()
+COLORS = ((Cell.BLACK, Cell.WHITE), (Cell.WHITE, Cell.BLACK))
+# plain ints of the cells for the array, numpy compares and assigns enum members
+# about 50 times slower
+EMPTY, BLACK, WHITE = (int(cell) for cell in Cell)
+# random 64 bit key of each color on each point. The hash of a board is the xor
+# of the keys of its stones, so a move only xors the keys of the changed points
+ZOBRIST: list[list[int]] = (
+    np.random.default_rng(0)
+    .integers(1, 2**63, size=(len(Cell), AMOUNT_POINTS), dtype=np.int64)
+    .tolist()
+)
+
+
+def zobrist_hash(stones: np.ndarray) -> int:
+    """Hash of a flat board, built from scratch."""
+    board_hash = 0
+    for point in np.flatnonzero(stones):
+        board_hash ^= ZOBRIST[stones[point]][point]
+    return board_hash
+
+
+def legal_move_mask(
+    boards: np.ndarray, colors, ko: np.ndarray | None = None
+) -> np.ndarray:
+    """Points of each board where a stone of its color may be played.
+
+    Takes boards of shape (n, GRID_SIZE, GRID_SIZE), one color per board and
+    optionally one ko point (flat index, -1 for none) per board. The chains of
+    all boards are labelled at once and a point is legal if it is empty, not the
+    ko point and the new stone keeps a liberty: an empty neighbor, an own
+    neighboring chain with another liberty or a captured opponent chain.
+    """
+    boards = np.asarray(boards, dtype=np.int8)
+    amount = len(boards)
+    own = np.broadcast_to(np.asarray(colors, dtype=np.int8), (amount,))[:, None, None]
+    opponent = 3 - own
+
+    # a border of 3 keeps the chains of stacked boards apart
+    padded = np.full((amount, GRID_SIZE + 2, GRID_SIZE + 2), 3, dtype=np.int8)
+    padded[:, 1:-1, 1:-1] = boards
+    stacked = padded.reshape(-1, GRID_SIZE + 2)
+    amount_black, black = cv2.connectedComponents(
+        (stacked == BLACK).astype(np.uint8), connectivity=4, ltype=cv2.CV_32S
+    )
+    _, white = cv2.connectedComponents(
+        (stacked == WHITE).astype(np.uint8), connectivity=4, ltype=cv2.CV_32S
+    )
+    labels = np.where(white > 0, white + amount_black, black).reshape(padded.shape)
+
+    shifts = [
+        (slice(None), slice(0, -2), slice(1, -1)),
+        (slice(None), slice(2, None), slice(1, -1)),
+        (slice(None), slice(1, -1), slice(0, -2)),
+        (slice(None), slice(1, -1), slice(2, None)),
+    ]
+    empty = boards == EMPTY
+    neighbor_labels = [labels[shift] for shift in shifts]
+
+    # liberties of a chain are the distinct empty points next to it, a point
+    # only counts for the first direction it touches a chain from
+    counted = []
+    for index, label in enumerate(neighbor_labels):
+        first = empty & (label > 0)
+        for earlier in neighbor_labels[:index]:
+            first &= label != earlier
+        counted.append(label[first])
+    liberties = np.bincount(
+        np.concatenate(counted), minlength=amount_black + white.max() + 1
+    )
+
+    keeps_liberty = np.zeros_like(empty)
+    for shift, label in zip(shifts, neighbor_labels):
+        neighbor = padded[shift]
+        neighbor_liberties = liberties[label]
+        keeps_liberty |= (
+            (neighbor == EMPTY)
+            | ((neighbor == own) & (neighbor_liberties > 1))
+            | ((neighbor == opponent) & (neighbor_liberties == 1))
+        )
+
+    legal = empty & keeps_liberty
+    if ko is not None:
+        ko = np.asarray(ko)
+        has_ko = ko >= 0
+        legal.reshape(amount, -1)[np.flatnonzero(has_ko), ko[has_ko]] = False
+    return legal
+
+
+@dataclass
+class Move:
+    """Everything needed to undo a move."""
+
+    position: int
+    color: int  # Cell value
+    captured: list[int] = field(default_factory=list)
+    # point the move was not allowed to be played on before it
+    ko: int | None = None
+    # hash of the board after the move
+    hash: int = 0
+
+
 class Game:
-    def __init__(self):
-        self.move: int = 0
-        self.captured_black: int = 0
-        self.captured_white: int = 0
-        self.board_history: list = []
-        self.board: list[list[Cell]] = self._initialize_board()
+    """Board and rules of a game.
+
+    The board is a flat int8 array (index y * GRID_SIZE + x) which is changed in
+    place. Each move only keeps its position and captured stones, so undo()
+    costs as much as the move changed.
+
+    Connected stones form chains which know their stones and liberties. They are
+    merged and removed as stones are added and captured, so captures, suicide
+    and atari are lookups instead of a flood fill per neighbor.
+
+    The zobrist hash of the board is updated with every move. With superko no
+    board may repeat, which is checked against the set of earlier hashes. Earlier
+    boards are not stored but replayed from the moves with board_at().
+    """
+
+    def __init__(self, superko: bool = False):
         self.neighbors = self.get_neighbors()
+        self.superko = superko
+        self.reset()
 
     def reset(self) -> None:
         self.move: int = 0
         self.captured_black: int = 0
         self.captured_white: int = 0
-        self.board_history: list = []
-        self.board = self._initialize_board()
-
-    @staticmethod
-    def _initialize_board() -> list[list[Cell]]:
-        return [[Cell.EMPTY for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
+        self.history: list[Move] = []
+        self.stones = np.zeros(AMOUNT_POINTS, dtype=np.int8)
+        # point which would retake a ko
+        self.ko: int | None = None
+        # chain of each point (-1 if empty), chains are keyed by one of their stones
+        self.chain: list[int] = [-1] * AMOUNT_POINTS
+        self.chain_stones: dict[int, list[int]] = {}
+        self.chain_liberties: dict[int, set[int]] = {}
+        # board before the first move of the history
+        self.initial_board: bytes = pack_board(self.stones)
+        self.initial_hash: int = 0
+        self.hash: int = 0
+        # hashes of all boards of the history, only kept for superko
+        self.positions: set[int] = {self.hash}
+
+    @property
+    def board(self) -> np.ndarray:
+        """Read only GRID_SIZE x GRID_SIZE view of the stones, indexed [y][x]."""
+        board = self.stones.reshape(GRID_SIZE, GRID_SIZE)
+        board.flags.writeable = False
+        return board
+
+    @board.setter
+    def board(self, board) -> None:
+        """Replaces all stones, also packed ones. Moves before can not be undone afterwards."""
+        if isinstance(board, bytes):
+            board = unpack_board(board)
+        self.stones[:] = np.asarray(board, dtype=np.int8).ravel()
+        self.history = []
+        self.ko = None
+        self.initial_board = pack_board(self.stones)
+        self.initial_hash = self.hash = zobrist_hash(self.stones)
+        self.positions = {self.hash}
+        self.chain = [-1] * AMOUNT_POINTS
+        self.chain_stones = {}
+        self.chain_liberties = {}
+        self._rebuild_chains(range(AMOUNT_POINTS))
+
+    @property
+    def packed(self) -> bytes:
+        """The board packed into 91 bytes, see board_encoding."""
+        return pack_board(self.stones)
 
     def current_and_opponent_color(self) -> tuple[Cell, Cell]:
         """Returns the color of the current player and the opponent based on self.move"""
-        current_color, opponent_color = (
-            (Cell.BLACK, Cell.WHITE),
-            (Cell.WHITE, Cell.BLACK),
-        )[self.move & 1]
-        return current_color, opponent_color
+        return COLORS[self.move & 1]
 
     def add_move(self, x: int, y: int) -> None:
         """Adds Cell at position x, y for the player whose turn it is."""
-        assert self.is_empty((x, y)), "Position occupied"
-
-        current_color, opponent_color = self.current_and_opponent_color()
-
-        # create copy since move might be invalid and should not change the current boards
-        board_after_capture = deepcopy(self.board)
-
-        # add move
-        board_after_capture[y][x] = current_color
-
-        # iterate over each neighbor and check if it has liberties
-        neighbors = self.neighbors[y][x]
-        captures = 0
-        for neighbor_x, neighbor_y in neighbors:
-            group, liberties = self.get_group_and_liberties(
-                neighbor_x, neighbor_y, board_after_capture
-            )
-
-            if liberties > 0:
-                continue
-
-            captures += len(group)
-            for cell in group:
-                cell_x, cell_y = cell
-                board_after_capture[cell_y][cell_x] = Cell.EMPTY
+        position = y * GRID_SIZE + x
+        stones, chain = self.stones, self.chain
+        assert chain[position] < 0, "Position occupied"
+        assert position != self.ko, "Move would lead to invalid repetition (ko)"
 
+        current_color, opponent_color = (
+            (WHITE, BLACK) if self.move & 1 else (BLACK, WHITE)
+        )
+
+        liberties, own, opponent = set(), set(), set()
+        for neighbor in NEIGHBORS[position]:
+            neighbor_chain = chain[neighbor]
+            if neighbor_chain < 0:
+                liberties.add(neighbor)
+            elif stones[neighbor] == current_color:
+                own.add(neighbor_chain)
+            else:
+                opponent.add(neighbor_chain)
+
+        # opponent chains whose last liberty is taken are captured
+        captured_chains = [c for c in opponent if len(self.chain_liberties[c]) == 1]
         # stone does not capture any stones and has no liberties afterwards
-        _, liberties = self.get_group_and_liberties(x, y, board_after_capture)
-
-        assert liberties > 0, "Move would lead to suicide"
-
-        if len(self.board_history) > 2:
-            # board position repeats => ko rule
-            assert board_after_capture != self.board_history[-2], (
-                "Move would lead to invalid repetition (ko)"
+        assert (
+            liberties
+            or captured_chains
+            or any(len(self.chain_liberties[c]) > 1 for c in own)
+        ), "Move would lead to suicide"
+
+        board_hash = self.hash ^ ZOBRIST[current_color][position]
+        for captured_chain in captured_chains:
+            for stone in self.chain_stones[captured_chain]:
+                board_hash ^= ZOBRIST[opponent_color][stone]
+        if self.superko:
+            assert board_hash not in self.positions, (
+                "Move would repeat an earlier board (superko)"
             )
-
-        if opponent_color == Cell.WHITE:
-            self.captured_white += captures
-        elif opponent_color == Cell.BLACK:
-            self.captured_black += captures
-
+            self.positions.add(board_hash)
+
+        stones[position] = current_color
+        for opponent_chain in opponent:
+            self.chain_liberties[opponent_chain].discard(position)
+        new_chain = self._merge(position, liberties, own)
+
+        captured = []
+        for captured_chain in captured_chains:
+            captured += self._remove_chain(captured_chain)
+
+        if self.move & 1:
+            self.captured_black += len(captured)
+        else:
+            self.captured_white += len(captured)
+
+        self.hash = board_hash
+        self.history.append(
+            Move(position, current_color, captured, self.ko, board_hash)
+        )
+        # a single stone which captured a single stone and has no other liberty
+        # could be captured right back, repeating the board
+        self.ko = (
+            captured[0]
+            if len(captured) == 1
+            and len(self.chain_stones[new_chain]) == 1
+            and len(self.chain_liberties[new_chain]) == 1
+            else None
+        )
         self.move += 1
-        self.board = board_after_capture
-        self.board_history.append(board_after_capture)
+
+    def undo(self) -> None:
+        """Takes back the last move."""
+        assert self.history, "No move to undo"
+        last = self.history.pop()
+        opponent_color = WHITE if last.color == BLACK else BLACK
+
+        # the chain of the move and the chains next to the changed points are built again
+        affected = self._remove_chain(self.chain[last.position], restore=True)
+        self.stones[last.position] = EMPTY
+        self.stones[last.captured] = opponent_color
+        for point in [last.position, *last.captured]:
+            for neighbor in NEIGHBORS[point]:
+                if self.chain[neighbor] >= 0:
+                    affected += self._remove_chain(self.chain[neighbor], restore=True)
+        self._rebuild_chains(affected + last.captured)
+
+        if opponent_color == WHITE:
+            self.captured_white -= len(last.captured)
+        else:
+            self.captured_black -= len(last.captured)
+        self.ko = last.ko
+        self.move -= 1
+        if self.superko:
+            self.positions.discard(self.hash)
+        self.hash = self.history[-1].hash if self.history else self.initial_hash
+
+    def board_at(self, move: int) -> np.ndarray:
+        """Flat board after the first move moves of the history (0 is the start)."""
+        assert 0 <= move <= len(self.history), f"No board after {move} moves"
+        stones = unpack_board(self.initial_board)
+        for past in self.history[:move]:
+            stones[past.position] = past.color
+            stones[past.captured] = EMPTY
+        return stones
+
+    def _merge(self, position: int, liberties: set[int], chains: set[int]) -> int:
+        """Adds the new stone at position to its neighboring chains of its color."""
+        if not chains:
+            self.chain[position] = position
+            self.chain_stones[position] = [position]
+            self.chain_liberties[position] = liberties
+            return position
+
+        # the stones of the smaller chains join the largest one
+        target = max(chains, key=lambda c: len(self.chain_stones[c]))
+        target_stones = self.chain_stones[target]
+        target_liberties = self.chain_liberties[target]
+        for other in chains - {target}:
+            for stone in self.chain_stones.pop(other):
+                self.chain[stone] = target
+                target_stones.append(stone)
+            target_liberties |= self.chain_liberties.pop(other)
+        self.chain[position] = target
+        target_stones.append(position)
+        target_liberties |= liberties
+        target_liberties.discard(position)
+        return target
+
+    def _remove_chain(self, chain: int, restore: bool = False) -> list[int]:
+        """Removes the chain and returns its stones.
+
+        The stones are taken from the board unless restore is set, in which case
+        only the chain itself is forgotten so it can be rebuilt.
+        """
+        stones = self.chain_stones.pop(chain)
+        del self.chain_liberties[chain]
+        for stone in stones:
+            self.chain[stone] = -1
+        if restore:
+            return stones
+
+        self.stones[stones] = EMPTY
+        # the captured points are new liberties of the chains around them
+        for stone in stones:
+            for neighbor in NEIGHBORS[stone]:
+                neighbor_chain = self.chain[neighbor]
+                if neighbor_chain >= 0:
+                    self.chain_liberties[neighbor_chain].add(stone)
+        return stones
+
+    def _rebuild_chains(self, points) -> None:
+        """Builds the chains of the stones at points with a flood fill."""
+        for point in points:
+            if self.stones[point] == EMPTY or self.chain[point] >= 0:
+                continue
+            group, liberties = self._group_and_liberties(point)
+            for stone in group:
+                self.chain[stone] = point
+            self.chain_stones[point] = group
+            self.chain_liberties[point] = liberties
+
+    def _group_and_liberties(self, position: int) -> tuple[list[int], set[int]]:
+        """Flat indexes of the group at position and its liberties."""
+        stones = self.stones
+        color = stones[position]
+        group = [position]
+        seen = {position}
+        liberties = set()
+        for index in group:
+            for neighbor in NEIGHBORS[index]:
+                if neighbor in seen:
+                    continue
+                value = stones[neighbor]
+                if value == color:
+                    group.append(neighbor)
+                    seen.add(neighbor)
+                elif value == EMPTY:
+                    liberties.add(neighbor)
+        return group, liberties
+
+    def legal_moves(self, color: Cell | None = None) -> np.ndarray:
+        """GRID_SIZE x GRID_SIZE mask of the points color may play on.
+
+        Defaults to the player whose turn it is. The ko point only applies to
+        that player. With superko the moves repeating a board are removed too.
+        """
+        current_color, _ = self.current_and_opponent_color()
+        color = current_color if color is None else color
+        ko = self.ko if color == current_color and self.ko is not None else -1
+        legal = legal_move_mask(self.board[None], color, np.array([ko]))[0]
+        if not self.superko or color != current_color:
+            return legal
+
+        # hash of the board after each legal move, captures are xored out below
+        keys = ZOBRIST[color]
+        hashes = {int(p): self.hash ^ keys[p] for p in np.flatnonzero(legal)}
+        opponent_color = 3 - int(color)
+        for chain, liberties in self.chain_liberties.items():
+            if len(liberties) > 1 or self.stones[chain] != opponent_color:
+                continue
+            (position,) = liberties
+            if position in hashes:
+                for stone in self.chain_stones[chain]:
+                    hashes[position] ^= ZOBRIST[opponent_color][stone]
+        for position, board_hash in hashes.items():
+            if board_hash in self.positions:
+                legal.flat[position] = False
+        return legal
+
+    def liberties(self, x: int, y: int) -> int:
+        """Amount of liberties of the chain at x, y."""
+        chain = self.chain[y * GRID_SIZE + x]
+        assert chain >= 0, "Position empty"
+        return len(self.chain_liberties[chain])
+
+    def is_atari(self, x: int, y: int) -> bool:
+        """True if the chain at x, y can be captured with the next move."""
+        return self.liberties(x, y) == 1
 
     def get_group_and_liberties(
-        self, x: int, y: int, board
+        self, x: int, y: int, board=None
     ) -> tuple[list[tuple[int, int]], int]:
+        """Stones of the group at x, y and its amount of liberties.
+
+        The chains answer this for the own board, other boards are flood filled.
+        """
+        if board is None:
+            chain = self.chain[y * GRID_SIZE + x]
+            assert chain >= 0, "Position empty"
+            return [
+                (stone % GRID_SIZE, stone // GRID_SIZE)
+                for stone in self.chain_stones[chain]
+            ], len(self.chain_liberties[chain])
+
         color = self.get_color((x, y), board)
 
         queue = set()
@@ -102,7 +452,7 @@ class Game:
             queue.add(neighbor)
 
         group = {(x, y)}
-        liberties = 0
+        liberties = set()
 
         while queue:
             cell = queue.pop()
@@ -111,56 +461,54 @@ class Game:
                 continue
 
             if self.is_empty((cell), board):
-                liberties += 1
+                liberties.add(cell)
 
             if self.get_color(cell, board) == color:
                 group.add(cell)
                 cell_x, cell_y = cell
                 queue.update(self.neighbors[cell_y][cell_x])
-        return list(group), liberties
+        return list(group), len(liberties)
 
     @staticmethod
+    @cache
     def get_neighbors() -> list:
         """Returns lookup table of neighbors for each x, y."""
-        lookup = []
-        for y in range(GRID_SIZE):
-            neighbor_row = []
-            for x in range(GRID_SIZE):
-                neighbors = []
-                # left
-                if x > 0:
-                    neighbors.append((x - 1, y))
-                # right
-                if x < GRID_SIZE - 1:
-                    neighbors.append((x + 1, y))
-                # top
-                if y > 0:
-                    neighbors.append((x, y - 1))
-                # bottom
-                if y < GRID_SIZE - 1:
-                    neighbors.append((x, y + 1))
-                neighbor_row.append(neighbors)
-            lookup.append(neighbor_row)
-        return lookup
+        return [
+            [
+                [
+                    (index % GRID_SIZE, index // GRID_SIZE)
+                    for index in NEIGHBORS[y * GRID_SIZE + x]
+                ]
+                for x in range(GRID_SIZE)
+            ]
+            for y in range(GRID_SIZE)
+        ]
 
     def get_color(self, coordinates: tuple[int, int], board=None) -> Cell:
-        board = self.board if board is None else board
         x, y = coordinates
+        if board is None:
+            return Cell(self.stones[y * GRID_SIZE + x])
         return board[y][x]
 
     def is_empty(self, coordinates: tuple[int, int], board=None) -> bool:
-        board = self.board if board is None else board
-        x, y = coordinates
-        return board[y][x] == Cell.EMPTY.value
+        return self.get_color(coordinates, board) == Cell.EMPTY.value
 
     def add_sgf(self, filename: Path) -> None:
         """Plays out complete sgf by adding each move."""
-        with open(filename, "rb") as f:
-            main_sequence = sgf.Sgf_game.from_bytes(f.read()).get_main_sequence()
-
-        for node in main_sequence:
-            _, move = node.get_move()
-            if move:
-                x, y = move
-                x, y = y, GRID_SIZE - 1 - x  # change due sgf coordinate order
-                self.add_move(x, y)
+        for x, y in sgf_moves(filename):
+            self.add_move(x, y)
+
+
+def sgf_moves(filename: Path) -> list[tuple[int, int]]:
+    """x, y of the moves of the main sequence of a sgf, passes are skipped."""
+    with open(filename, "rb") as f:
+        main_sequence = sgf.Sgf_game.from_bytes(f.read()).get_main_sequence()
+
+    moves = []
+    for node in main_sequence:
+        _, move = node.get_move()
+        if move:
+            x, y = move
+            x, y = y, GRID_SIZE - 1 - x  # change due sgf coordinate order
+            moves.append((x, y))
+    return moves
@@ -1,5 +1,8 @@
 import json
 import subprocess
+from collections import Counter
+from collections.abc import Iterator
+from math import factorial
 from pathlib import Path
 
 import numpy as np
@@ -7,9 +10,15 @@ from sgfmill import sgf
 from tqdm import tqdm
 
 from src import GRID_SIZE, KATAGO_PATH, KOMI
-from src.utils.game import Cell
+from src.utils.board_encoding import unpack_board
+from src.utils.custom_logger import get_color_logger
+from src.utils.game import EMPTY, Cell, Game
+
+logger = get_color_logger()
 
 X_AXIS = "ABCDEFGHJKLMNOPQRST"
+# logged by the analysis engine once the neural net is loaded
+KATAGO_READY_MESSAGE = "ready to begin handling requests"
 
 
 def convert_cell_to_player_color(cell: Cell) -> str:
@@ -74,63 +83,144 @@ def start_katago_process() -> subprocess.Popen[str]:
     return process
 
 
+def wait_until_ready(process: subprocess.Popen[str]) -> bool:
+    """Blocks until KataGo loaded its model. False if KataGo exited before."""
+    assert process.stderr is not None
+    for line in process.stderr:
+        if KATAGO_READY_MESSAGE in line:
+            return True
+    return False
+
+
 def get_best_variation(
     process,
-    board: list[list[Cell]],
+    board: bytes,
     moves: list[tuple[Cell, tuple[int, int]]],
     current_player_cell: Cell,
+    final_board: bytes | None = None,
 ) -> list[tuple[Cell, tuple[int, int]]]:
-    initial_stones = convert_board_to_initial_stones(board)
-    sgf_moves = convert_to_sgf_moves(moves)
-    current_player = convert_cell_to_player_color(current_player_cell)
-    variations = possible_variations(sgf_moves, current_player)
+    """Order of the moves whose score lead changes the least.
 
-    amount_moves = len(moves)
-    analyse_turns = [i for i in range(amount_moves)]
+    Only legal orders which end in the final board are analysed. Returns an
+    empty list if there is none.
+    """
+    initial_stones = convert_board_to_initial_stones(board)
+    search = VariationSearch(board, moves, current_player_cell, final_board)
+    # the orders are added one by one, only their unique prefixes are kept
+    tree = PrefixTree()
+    for variation in search:
+        tree.add(variation)
+    logger.debug(f"Variations: {search.stats()}")
+    if not tree.last_moves:
+        return []
+    logger.debug(
+        f"KataGo queries: {tree.variations * len(moves)} positions of "
+        f"{tree.variations} variations before, {len(tree)} unique prefixes after"
+    )
 
-    for i, moves in enumerate(variations):
+    for node in range(len(tree)):
+        prefix = convert_to_sgf_moves(tree.prefix(node))
         data = {
-            "id": str(i),  # has to be string
+            "id": str(node),  # has to be string
             "initialStones": initial_stones,
-            "moves": moves,
+            "moves": prefix,
+            # the empty prefix has no move which tells katago who is to play
+            "initialPlayer": convert_cell_to_player_color(current_player_cell),
             "rules": "tromp-taylor",
             "komi": KOMI,
             "boardXSize": GRID_SIZE,
             "boardYSize": GRID_SIZE,
-            "analyzeTurns": analyse_turns,
+            "analyzeTurns": [len(prefix)],
         }
         send_position_to_katago(process, data)
 
-    results = {str(i): [] for i in range(len(variations))}
-    for i in tqdm(range(amount_moves * len(variations))):
+    score_leads = np.zeros(len(tree))
+    for _ in tqdm(range(len(tree))):
         while True:
             new_data = process.stdout.readline().strip()
             if new_data:
                 result = json.loads(new_data)
-                results[result["id"]].append(result)
+                score_leads[int(result["id"])] = result["rootInfo"]["scoreLead"]
                 break
 
-    diffs = [
-        (
-            k,
-            abs(
-                np.array([m["rootInfo"]["scoreLead"] for m in v])
-                - np.array(
-                    [v[max(0, i - 1)]["rootInfo"]["scoreLead"] for i in range(len(v))]
-                )
-            ).mean(),
-        )
-        for k, v in results.items()
-    ]
-    diffs.sort(key=lambda r: r[1])
-
-    best_variation = variations[int(diffs[0][0])]
-    best_sequence = []
-    for color, sgf_position in best_variation:
-        cell = Cell.BLACK if color == "B" else Cell.WHITE
-        position = convert_coordinate_to_move(sgf_position)
-        best_sequence.append((cell, position))
-    return best_sequence
+    # the position after the last move is not analysed, so the mean change of the
+    # score lead of a variation is the one of its prefix without the last move
+    changes = tree.accumulate(score_leads)
+    best = min(tree.last_moves, key=lambda node: changes[node])
+    return tree.variation(best)
+
+
+class PrefixTree:
+    """Unique prefixes of variations of the same moves, built one variation at a time.
+
+    Node 0 is the empty prefix, every other node is its parent's prefix plus one
+    move. A variation ends in the node of all its moves but the last one, which
+    is stored in last_moves. Variations which start with the same moves share
+    their nodes, so each position is analysed only once and the variations
+    themselves are never kept.
+
+    The variations have to be added in depth first order, as VariationSearch
+    yields them. A prefix which differs from the previous variation is then
+    never seen again, so only the path of the previous variation is kept to
+    find the shared nodes.
+    """
+
+    def __init__(self):
+        # the moves are kept as the objects of the variations, so nodes with the
+        # same move share it
+        self.parents: list[int] = [-1]
+        self.moves: list[tuple[Cell, tuple[int, int]] | None] = [None]
+        # nodes of the previous variation, path[i] is its prefix of length i
+        self.path: list[int] = [0]
+        # last move of the variation ending in a node. Ends of the same moves
+        # have only one remaining move, so there is one per node
+        self.last_moves: dict[int, tuple[Cell, tuple[int, int]]] = {}
+        self.variations: int = 0
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    def add(self, variation: list[tuple[Cell, tuple[int, int]]]) -> None:
+        shared = 1
+        while (
+            shared < len(self.path)
+            and shared < len(variation)
+            and self.moves[self.path[shared]] == variation[shared - 1]
+        ):
+            shared += 1
+        del self.path[shared:]
+
+        for move in variation[shared - 1 : -1]:
+            self.parents.append(self.path[-1])
+            self.moves.append(move)
+            self.path.append(len(self.parents) - 1)
+        self.last_moves.setdefault(self.path[-1], variation[-1])
+        self.variations += 1
+
+    def prefix(self, node: int) -> list[tuple[Cell, tuple[int, int]]]:
+        moves = []
+        while node > 0:
+            moves.append(self.moves[node])
+            node = self.parents[node]
+        return moves[::-1]
+
+    def variation(self, node: int) -> list[tuple[Cell, tuple[int, int]]]:
+        return [*self.prefix(node), self.last_moves[node]]
+
+    def accumulate(self, score_leads: np.ndarray) -> np.ndarray:
+        """Mean change of the score lead from the empty prefix to every node.
+
+        The mean is taken over all positions of a variation, including the
+        empty prefix, which has no change.
+        """
+        total = np.zeros(len(self))
+        depth = np.zeros(len(self))
+        # parents are always added before their children
+        for node in range(1, len(self)):
+            parent = self.parents[node]
+            total[node] = total[parent] + abs(score_leads[node] - score_leads[parent])
+            depth[node] = depth[parent] + 1
+        return total / (depth + 1)
 
 
 def convert_to_sgf_moves(
@@ -144,35 +234,98 @@ def convert_to_sgf_moves(
     return sgf_moves
 
 
-def convert_board_to_initial_stones(board: list[list[Cell]]) -> list[tuple[str, str]]:
+def convert_board_to_initial_stones(board: bytes) -> list[tuple[str, str]]:
+    """Stones of a packed board (see board_encoding) in the katago format."""
+    stones = unpack_board(board)
     initial_stones = []
-    for y in range(GRID_SIZE):
-        for x in range(GRID_SIZE):
-            cell = board[y][x]
-            if cell == Cell.EMPTY:
-                continue
-
-            player_color = convert_cell_to_player_color(cell)
-            sgf_position = convert_move_to_coordinate(x, y)
-            initial_stones.append((player_color, sgf_position))
+    for point in np.flatnonzero(stones):
+        y, x = divmod(int(point), GRID_SIZE)
+        player_color = convert_cell_to_player_color(Cell(stones[point]))
+        sgf_position = convert_move_to_coordinate(x, y)
+        initial_stones.append((player_color, sgf_position))
     return initial_stones
 
 
-def possible_variations(
-    moves: list[tuple[str, str]], current_player: str, branch: list = []
-) -> list:
-    """Create a list of all possible variations with the moves provided."""
-    if not moves:
-        return [branch]
-
-    variations = []
-    player_moves = [move for move in moves if move[0] == current_player]
+class VariationSearch:
+    """Orders in which the missing moves could have been played.
+
+    The orders are generated lazily by playing them on a Game, so a branch is
+    dropped as soon as a move is illegal (occupied, suicide or ko) or captures a
+    stone which is on the observed final board and not played again later.
+    """
+
+    def __init__(
+        self,
+        board: bytes,
+        moves: list[tuple[Cell, tuple[int, int]]],
+        current_player: Cell,
+        final_board: bytes | None = None,
+    ):
+        self.game = Game()
+        self.game.board = board
+        self.game.move = 0 if current_player == Cell.BLACK else 1
+        self.moves = moves
+        self.final_board = final_board
+        self.final_stones = None if final_board is None else unpack_board(final_board)
+
+        self.generated: int = 0
+        self.pruned: Counter[str] = Counter()
+
+    def __iter__(self) -> Iterator[list[tuple[Cell, tuple[int, int]]]]:
+        yield from self._search([], list(self.moves))
+
+    def _search(
+        self,
+        branch: list[tuple[Cell, tuple[int, int]]],
+        remaining: list[tuple[Cell, tuple[int, int]]],
+    ) -> Iterator[list[tuple[Cell, tuple[int, int]]]]:
+        if not remaining:
+            if self.final_board is None or self.game.packed == self.final_board:
+                self.generated += 1
+                yield list(branch)
+            else:
+                self.pruned["final board"] += 1
+            return
+
+        color, _ = self.game.current_and_opponent_color()
+        for move in remaining:
+            if move[0] != color:
+                continue
+            try:
+                self.game.add_move(*move[1])
+            except AssertionError:
+                self.pruned["illegal"] += 1
+                continue
 
-    for pm in player_moves:
-        new_moves = [m for m in moves if m != pm]
-        new_branch = branch + [pm]
-        variations += possible_variations(
-            new_moves, opponent(current_player), new_branch
+            rest = [m for m in remaining if m is not move]
+            if self._contradicts_final_board(rest):
+                self.pruned["captures"] += 1
+            else:
+                branch.append(move)
+                yield from self._search(branch, rest)
+                branch.pop()
+            self.game.undo()
+
+    def _contradicts_final_board(
+        self, remaining: list[tuple[Cell, tuple[int, int]]]
+    ) -> bool:
+        """True if the last move captured a stone the final board still shows."""
+        if self.final_stones is None:
+            return False
+        refilled = {y * GRID_SIZE + x for _, (x, y) in remaining}
+        return any(
+            self.final_stones[point] != EMPTY and point not in refilled
+            for point in self.game.history[-1].captured
         )
 
-    return variations
+    def orders(self) -> int:
+        """Amount of alternating orders of the moves without any pruning."""
+        counts = Counter(color for color, _ in self.moves)
+        return factorial(counts[Cell.BLACK]) * factorial(counts[Cell.WHITE])
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "orders": self.orders(),
+            "generated": self.generated,
+            **{f"pruned {reason}": amount for reason, amount in self.pruned.items()},
+        }
@@ -0,0 +1,147 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from src import CELL_SIZE, GRID_SIZE, HALF_CELL_SIZE, HOSHIS, SCREEN_SIZE
+from src.utils.colors import Color
+from src.utils.game import Cell
+
+UI_FPS = 15
+WINDOW_NAME = "Complete"
+
+
+def base_visual_board() -> MatLike:
+    frame = np.full((SCREEN_SIZE, SCREEN_SIZE, 3), Color.BROWN.value, dtype=np.uint8)
+
+    # draw lines
+    for i in range(GRID_SIZE):
+        start = HALF_CELL_SIZE
+        end = SCREEN_SIZE - HALF_CELL_SIZE
+        height = i * CELL_SIZE + HALF_CELL_SIZE
+        frame = cv2.line(frame, (start, height), (end, height), Color.BLACK.value, 1)
+        frame = cv2.line(frame, (height, start), (height, end), Color.BLACK.value, 1)
+
+    # draw hoshis
+    for x in HOSHIS:
+        for y in HOSHIS:
+            frame = cv2.circle(
+                frame,
+                (HALF_CELL_SIZE + x * CELL_SIZE, HALF_CELL_SIZE + y * CELL_SIZE),
+                int(CELL_SIZE * 0.1),
+                Color.BLACK.value,
+                -1,
+            )
+    return frame
+
+
+def draw_stone(frame: MatLike, x: int, y: int, cell: Cell) -> None:
+    if cell == Cell.BLACK:
+        color = Color.BLACK.value
+    elif cell == Cell.WHITE:
+        color = Color.WHITE.value
+    else:
+        return
+
+    cv2.circle(
+        frame,
+        (HALF_CELL_SIZE + CELL_SIZE * x, HALF_CELL_SIZE + CELL_SIZE * y),
+        HALF_CELL_SIZE,
+        color,
+        -1,
+    )
+
+
+class BoardRenderer:
+    """Draws the camera image next to the digital board on a background thread.
+
+    The digital board is a persistent canvas where only changed stones are
+    redrawn. Frames are only accepted at the capped UI rate and the window itself
+    is updated from the calling (main) thread with show(), since most GUI
+    backends only work there.
+    """
+
+    def __init__(self, ui_fps: int = UI_FPS, window_name: str = WINDOW_NAME):
+        self.interval = 1 / ui_fps
+        self.window_name = window_name
+        self.base = base_visual_board()
+        self.canvas = self.base.copy()
+        self.drawn = np.zeros((GRID_SIZE, GRID_SIZE), dtype=np.int8)
+        self.display = np.zeros((SCREEN_SIZE, 2 * SCREEN_SIZE, 3), dtype=np.uint8)
+
+        self._image = np.zeros((SCREEN_SIZE, SCREEN_SIZE, 3), dtype=np.uint8)
+        self._board = self.drawn.copy()
+        self._last_submit = 0.0
+        self._has_pending = False
+        self._has_display = False
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "BoardRenderer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join()
+        cv2.destroyAllWindows()
+
+    def due(self) -> bool:
+        """True if enough time passed to render a new frame."""
+        return time.monotonic() - self._last_submit >= self.interval
+
+    def submit(self, image: MatLike, board) -> None:
+        """Hands over the current top down image and board. Both are copied."""
+        self._last_submit = time.monotonic()
+        with self._condition:
+            np.copyto(self._image, image)
+            self._board[:] = board
+            self._has_pending = True
+            self._condition.notify_all()
+
+    def show(self) -> None:
+        """Shows the newest rendered frame. Must be called from the main thread."""
+        with self._lock:
+            if not self._has_display:
+                return
+            cv2.imshow(self.window_name, self.display)
+            self._has_display = False
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._has_pending or self._stopped)
+                if self._stopped:
+                    return
+                self._draw_changed_stones(self._board)
+                self.display[:, :SCREEN_SIZE] = self._image
+                self.display[:, SCREEN_SIZE:] = self.canvas
+                self._has_pending = False
+                self._has_display = True
+
+    def _draw_changed_stones(self, board: np.ndarray) -> None:
+        changed = np.argwhere(board != self.drawn)
+        if len(changed) == 0:
+            return
+
+        # stones reach 1px into the next cell, so neighbors have to be redrawn as well
+        redraw = set()
+        for y, x in changed:
+            top = max(0, y * CELL_SIZE - 1)
+            left = max(0, x * CELL_SIZE - 1)
+            bottom = (y + 1) * CELL_SIZE + 1
+            right = (x + 1) * CELL_SIZE + 1
+            self.canvas[top:bottom, left:right] = self.base[top:bottom, left:right]
+            for dy, dx in ((0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)):
+                if 0 <= y + dy < GRID_SIZE and 0 <= x + dx < GRID_SIZE:
+                    redraw.add((y + dy, x + dx))
+
+        for y, x in redraw:
+            draw_stone(self.canvas, x, y, board[y, x])
+        self.drawn[:] = board
@@ -0,0 +1,91 @@
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+
+from src import GRID_SIZE
+from src.utils.board_encoding import pack_boards
+from src.utils.game import AMOUNT_POINTS, Game, sgf_moves
+
+# games handed to a worker at once, larger chunks cost less communication
+REPLAY_CHUNK_SIZE = 8
+
+
+@dataclass
+class ReplayedGame:
+    """All boards of a sgf as arrays, index 0 is the empty board."""
+
+    path: Path
+    moves: np.ndarray  # (n,) int16 flat index y * GRID_SIZE + x of each move
+    # (n + 1, AMOUNT_POINTS) int8 Cell values or (n + 1, PACKED_SIZE) uint8 if packed
+    boards: np.ndarray
+    captures: np.ndarray  # (n,) int16 stones captured by each move
+    hashes: np.ndarray  # (n + 1,) uint64 zobrist hash of each board
+    # reason the replay stopped before the end of the sgf, e.g. an illegal move
+    error: str | None = None
+
+
+def sgf_paths(source: Path | Iterable[Path]) -> list[Path]:
+    """The sgf files of a directory or the given files."""
+    if isinstance(source, Path) and source.is_dir():
+        return sorted(source.glob("*.sgf"))
+    if isinstance(source, Path):
+        return [source]
+    return list(source)
+
+
+def replay_sgf(path: Path, packed: bool = False) -> ReplayedGame:
+    """Plays out the main sequence of a sgf and keeps the board after every move.
+
+    Packed boards (see board_encoding) are a quarter of the size to send
+    between processes.
+    """
+    moves = sgf_moves(path)
+    boards = np.zeros((len(moves) + 1, AMOUNT_POINTS), dtype=np.int8)
+    captures = np.zeros(len(moves), dtype=np.int16)
+    hashes = np.zeros(len(moves) + 1, dtype=np.uint64)
+
+    game = Game()
+    error = None
+    for index, (x, y) in enumerate(moves):
+        try:
+            game.add_move(x, y)
+        except AssertionError as e:
+            error = f"Move {index} {(x, y)}: {e}"
+            break
+        boards[index + 1] = game.stones
+        captures[index] = len(game.history[-1].captured)
+        hashes[index + 1] = game.hash
+
+    played = len(game.history)
+    return ReplayedGame(
+        path=path,
+        moves=np.array(
+            [y * GRID_SIZE + x for x, y in moves[:played]],
+            dtype=np.int16,
+        ),
+        boards=pack_boards(boards[: played + 1]) if packed else boards[: played + 1],
+        captures=captures[:played],
+        hashes=hashes[: played + 1],
+        error=error,
+    )
+
+
+def replay_sgfs(
+    source: Path | Iterable[Path], workers: int | None = None, packed: bool = False
+) -> Iterator[ReplayedGame]:
+    """Replays many sgfs on a process pool and yields them in order.
+
+    workers=None uses all cores, workers=1 replays in the calling process.
+    """
+    paths = sgf_paths(source)
+    replay = partial(replay_sgf, packed=packed)
+    if workers == 1:
+        yield from map(replay, paths)
+        return
+
+    with ProcessPoolExecutor(workers) as pool:
+        yield from pool.map(replay, paths, chunksize=REPLAY_CHUNK_SIZE)
@@ -1,17 +1,22 @@
-from sgfmill import sgf
+import numpy as np
 
-from src import ROOT_DIR, SGF_PATH
+from src import GRID_SIZE, ROOT_DIR, SGF_PATH
 from src.utils.game import Game
+from src.utils.replay import replay_sgfs
 from src.utils.visualize import save_png
 
-for i in range(1, 21):
-    with open(SGF_PATH.joinpath(f"{i}.sgf"), "rb") as f:
-        sgf_game = sgf.Sgf_game.from_bytes(f.read())
 
-    game = Game()
-    for node in sgf_game.get_main_sequence():
-        _, move = node.get_move()
-        if move:
-            game.add_move(*move)
+def main():
+    for replayed in replay_sgfs(SGF_PATH):
+        game = Game()
+        # the images were drawn with the sgf row as x, a quarter turn from Game.add_sgf
+        game.board = np.rot90(replayed.boards[-1].reshape(GRID_SIZE, GRID_SIZE), -1)
 
-    save_png(game, ROOT_DIR.joinpath(f"images/boards/game_{i}.png"))
+        save_png(
+            game, ROOT_DIR.joinpath(f"images/boards/game_{replayed.path.stem}.png")
+        )
+
+
+# workers of the process pool import this module again, so it must not replay on import
+if __name__ == "__main__":
+    main()
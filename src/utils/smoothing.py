@@ -0,0 +1,63 @@
+import numpy as np
+
+from src.utils.cell_extractor import AMOUNT_CELLS
+from src.utils.game import Cell
+
+# weight of the newest frame in the moving average of the class probabilities
+EMA_ALPHA = 0.5
+# lead of a class over the committed one in the smoothed probabilities before a
+# cell switches to it. Random forest probabilities are often far below 1, so an
+# absolute threshold would never commit some stones
+COMMIT_MARGIN = 0.25
+
+
+class CellFilter:
+    """Smooths the class probabilities of every cell over time.
+
+    Each cell keeps an exponential moving average of its probabilities and only
+    switches to another class once its average leads the committed class by the
+    margin (hysteresis). A single flickering frame therefore does not change the
+    board, while a confidently classified stone is committed after two frames.
+    """
+
+    def __init__(self, alpha: float = EMA_ALPHA, margin: float = COMMIT_MARGIN):
+        assert 0 < alpha <= 1, "alpha must be in (0, 1]"
+        self.alpha = alpha
+        self.margin = margin
+
+        self.probabilities = np.zeros((AMOUNT_CELLS, len(Cell)), dtype=np.float32)
+        self.labels = np.zeros(AMOUNT_CELLS, dtype=np.int8)
+        self.initialized = False
+        self.commits: int = 0
+
+    def update(self, probabilities: np.ndarray) -> np.ndarray:
+        """Adds the probabilities of the next frame and returns the committed labels."""
+        if not self.initialized:
+            self.probabilities[:] = probabilities
+            self.labels[:] = probabilities.argmax(axis=1)
+            self.initialized = True
+            return self.labels
+
+        self.probabilities += self.alpha * (probabilities - self.probabilities)
+        best = self.probabilities.argmax(axis=1).astype(np.int8)
+        lead = self.probabilities.max(axis=1) - self.confidence
+        switch = lead >= self.margin
+        self.labels[switch] = best[switch]
+        self.commits += int(switch.sum())
+        return self.labels
+
+    @property
+    def confidence(self) -> np.ndarray:
+        """Smoothed probability of the committed label of each cell in row major order."""
+        return self.probabilities[np.arange(AMOUNT_CELLS), self.labels]
+
+    def uncertain_cells(self) -> np.ndarray:
+        """Indexes of cells whose committed label is no longer the most probable one."""
+        return np.flatnonzero(self.probabilities.argmax(axis=1) != self.labels)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "commits": self.commits,
+            "uncertain": len(self.uncertain_cells()),
+            "min_confidence": round(float(self.confidence.min()), 3),
+        }
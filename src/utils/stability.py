@@ -0,0 +1,43 @@
+import numpy as np
+
+from src.utils.cell_extractor import AMOUNT_CELLS
+
+
+class StabilityTracker:
+    """Tracks for how many frames the classified board and each cell did not change.
+
+    Boards are kept as int8 arrays and compared by their bytes, so an update costs
+    a single comparison of 361 bytes instead of comparing lists of Cells. Packing
+    them (see board_encoding) would cost more than it saves on the comparison.
+    """
+
+    def __init__(self):
+        self.frame: int = 0
+        # consecutive frames, including the current one, with an identical board
+        self.run_length: int = 0
+        self.board = np.full(AMOUNT_CELLS, -1, dtype=np.int8)
+        self.key: bytes = self.board.tobytes()
+        # frame at which each cell got its current label
+        self.stable_since = np.zeros(AMOUNT_CELLS, dtype=np.int64)
+
+    def update(self, labels: np.ndarray) -> int:
+        """Adds the labels of the next frame and returns the current run length."""
+        key = labels.astype(np.int8, copy=False).tobytes()
+        if key == self.key:
+            self.run_length += 1
+        else:
+            new_board = np.frombuffer(key, dtype=np.int8)
+            self.stable_since[new_board != self.board] = self.frame
+            self.board = new_board
+            self.key = key
+            self.run_length = 1
+        self.frame += 1
+        return self.run_length
+
+    def is_stable(self, frames: int) -> bool:
+        """True if the last frames boards, including the current one, are identical."""
+        return self.run_length >= frames
+
+    def stable_frames(self) -> np.ndarray:
+        """Amount of frames each cell kept its current label in row major order."""
+        return self.frame - self.stable_since
@@ -0,0 +1,42 @@
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+
+class StartupProfile:
+    """Start and end of each startup stage in seconds since the profile was created.
+
+    Stages may run on different threads, overlapping stages ran in parallel.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        return time.perf_counter() - self.start
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        start = self.now()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stages[stage] = (start, self.now())
+
+    def mark(self, stage: str) -> None:
+        """Records a point in time, e.g. when the recording starts."""
+        now = self.now()
+        with self._lock:
+            self.stages[stage] = (now, now)
+
+    def report(self) -> list[str]:
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda item: item[1])
+        return [
+            f"{stage:<24}{start:>8.2f}s{end:>8.2f}s{end - start:>8.2f}s"
+            for stage, (start, end) in stages
+        ]